@@ -0,0 +1,221 @@
+# batch_grade.py - 批次閱卷：讀 CSV / JSONL 的 (科目, 題目, 擬答)，同時批改多份，結果邊做邊寫進 JSONL，中斷後重跑會從上次的地方接著做
+# 用法：python batch_grade.py answers.csv --out graded.jsonl --concurrency 4
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 4))
+SAVE_BATCH_SIZE = 20  # 湊滿幾筆存檔一次 (Sheets 一次 append_rows)
+SAVE_INTERVAL = 10.0  # 沒湊滿也最多隔幾秒存一次
+# 欄位名稱：英文或跟試算表一樣的中文都可以
+COLUMNS = {
+    "subject": ("subject", "科目"),
+    "question": ("question", "題目"),
+    "answer": ("answer", "擬答", "你的擬答"),
+}
+
+
+def parse_rows(text, fmt):
+    # fmt: "csv" 或 "jsonl"；缺欄位的列略過
+    if fmt == "jsonl":
+        raw = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        raw = list(csv.DictReader(io.StringIO(text.lstrip("﻿"))))
+    rows = []
+    for item in raw:
+        row = {}
+        for field, names in COLUMNS.items():
+            row[field] = next((str(item[n]).strip() for n in names if item.get(n)), "")
+        if all(row.values()):
+            rows.append(row)
+    return rows
+
+
+def load_rows(path):
+    fmt = "jsonl" if path.lower().endswith((".jsonl", ".json")) else "csv"
+    with open(path, encoding="utf-8-sig") as f:
+        return parse_rows(f.read(), fmt)
+
+
+def row_key(row):
+    payload = "\0".join(row[f] for f in COLUMNS)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_checkpoint(out_path):
+    # 已經成功批改過的 key；失敗的那幾筆重跑時會再做一次
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # 上次寫到一半被中斷
+            if result.get("status") == "ok":
+                done.add(result["key"])
+    return done
+
+
+class BatchGrader:
+    # grade_one(subject, question, answer) -> (批改內容, CallStats)，在執行緒裡跑 (Groq 限流由 client 自己處理)；
+    # outbox 有給就把結果整批存進去 (每批一次 enqueue_many)，成功的結果要存進 outbox 後才寫進輸出檔，續跑時不會漏存
+    def __init__(self, grade_one, out_path, outbox=None, concurrency=BATCH_CONCURRENCY,
+                 save_batch_size=SAVE_BATCH_SIZE, save_interval=SAVE_INTERVAL, on_result=None):
+        self.grade_one = grade_one
+        self.out_path = out_path
+        self.outbox = outbox
+        self.concurrency = max(1, concurrency)
+        self.save_batch_size = save_batch_size
+        self.save_interval = save_interval
+        self.on_result = on_result  # on_result(result, counts)：進度回報
+        self.counts = {"total": 0, "skipped": 0, "duplicates": 0, "ok": 0, "error": 0}
+        self._pending = []
+        self._last_save = time.monotonic()
+
+    def run(self, rows):
+        return asyncio.run(self.run_async(rows))
+
+    async def run_async(self, rows):
+        start = time.perf_counter()
+        done = load_checkpoint(self.out_path)
+        queued = set()
+        queue = asyncio.Queue()
+        for row in rows:
+            key = row_key(row)
+            if key in done:
+                self.counts["skipped"] += 1
+                continue
+            if key in queued:
+                # 同一份檔案裡重複的列只批改一次，也算略過
+                self.counts["skipped"] += 1
+                self.counts["duplicates"] += 1
+                continue
+            queued.add(key)
+            queue.put_nowait((key, row))
+        self.counts["total"] = len(rows)
+        if os.path.dirname(self.out_path):
+            os.makedirs(os.path.dirname(self.out_path), exist_ok=True)
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor, \
+                open(self.out_path, "a", encoding="utf-8") as out:
+            workers = [self._worker(queue, loop, executor, out) for _ in range(self.concurrency)]
+            await asyncio.gather(*workers)
+            self._save(out)
+        self.counts["elapsed"] = round(time.perf_counter() - start, 3)
+        return self.counts
+
+    async def _worker(self, queue, loop, executor, out):
+        while not queue.empty():
+            key, row = queue.get_nowait()
+            start = time.perf_counter()
+            result = {"key": key, **row}
+            try:
+                feedback, stats = await loop.run_in_executor(executor, self._grade, row)
+                result.update(
+                    status="ok", feedback=feedback, model=stats.model, cached=stats.cached,
+                    prompt_tokens=stats.prompt_tokens, completion_tokens=stats.completion_tokens,
+                )
+            except Exception as e:
+                result.update(status="error", error=f"{type(e).__name__}: {e}"[:300])
+            result["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            result["created_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._finished(result, out)
+
+    def _grade(self, row):
+        with instrument.trace():
+            return self.grade_one(row["subject"], row["question"], row["answer"])
+
+    def _finished(self, result, out):
+        # 在 event loop 執行緒裡跑，寫檔不用另外上鎖
+        if result["status"] == "ok" and self.outbox is not None:
+            self._pending.append(result)
+            if len(self._pending) >= self.save_batch_size or time.monotonic() - self._last_save >= self.save_interval:
+                self._save(out)
+        else:
+            self._write(out, [result])
+
+    def _save(self, out):
+        batch, self._pending = self._pending, []
+        self._last_save = time.monotonic()
+        if not batch:
+            return
+        with instrument.span("save_enqueue", batch=len(batch)):
+            record_ids = self.outbox.enqueue_many(batch)
+        for result, record_id in zip(batch, record_ids):
+            result["record_id"] = record_id
+        self._write(out, batch)
+
+    def _write(self, out, results):
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self.counts[result["status"]] += 1
+        out.flush()
+        if self.on_result:
+            for result in results:
+                self.on_result(result, self.counts)
+
+
+def load_secrets():
+    # 跟網頁一樣讀 .streamlit/secrets.toml；找不到就用環境變數
+    import streamlit as st
+
+    try:
+        return dict(st.secrets)
+    except Exception:
+        names = ("GROQ_API_KEY", "GOOGLE_SHEETS_KEY", "NOTION_TOKEN", "NOTION_DATABASE_ID")
+        return {name: os.environ[name] for name in names if name in os.environ}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批次閱卷 (CSV / JSONL：subject, question, answer)")
+    parser.add_argument("input")
+    parser.add_argument("--out", help="結果 JSONL (預設：輸入檔名.graded.jsonl；已存在就續跑)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--save-batch", type=int, default=SAVE_BATCH_SIZE, help="每幾筆整批存進 Sheets / Notion")
+    parser.add_argument("--no-save", action="store_true", help="只寫結果檔，不同步 Sheets / Notion")
+    args = parser.parse_args()
+
+    from grading import grade
+    from laws import law_database
+    from llm_cache import get_llm_cache
+    from outbox import get_outbox
+    from resources import default_sinks, get_groq_client
+
+    instrument.setup()
+    secrets = load_secrets()
+    if not secrets.get("GROQ_API_KEY"):
+        raise SystemExit("找不到 GROQ_API_KEY (secrets.toml 或環境變數)")
+    client = get_groq_client(secrets["GROQ_API_KEY"])
+    cache = get_llm_cache()
+    box = None if args.no_save else get_outbox(default_sinks(secrets))
+    out_path = args.out or os.path.splitext(args.input)[0] + ".graded.jsonl"
+
+    def progress(result, counts):
+        done = counts["ok"] + counts["error"] + counts["skipped"]
+        mark = "✓" if result["status"] == "ok" else "✗ " + result["error"]
+        print(f"[{done}/{counts['total']}] {result['subject']} {result['latency_ms']:.0f}ms {mark}", flush=True)
+
+    grader = BatchGrader(
+        lambda subject, question, answer: grade(client, cache, law_database, subject, question, answer),
+        out_path, outbox=box, concurrency=args.concurrency, save_batch_size=args.save_batch, on_result=progress,
+    )
+    counts = grader.run(load_rows(args.input))
+    print(f"完成 {counts['ok']}・失敗 {counts['error']}・略過 {counts['skipped']} (其中重複 {counts['duplicates']})・耗時 {counts['elapsed']}s → {out_path}")
+    if box is not None:
+        box.wait_idle(timeout=300)
+        for sink, status in box.status().items():
+            print(f"{sink}：待送 {status['pending']}・失敗 {status['failed']}・完成 {status['delivered']}")
+
+
+if __name__ == "__main__":
+    main()
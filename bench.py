@@ -0,0 +1,222 @@
+# bench.py - 出題→作答→閱卷→存檔 端到端延遲量測 (Groq / Sheets / Notion 全換成本機假後端)
+# 用法：python bench.py --iterations 30 --sheet-rows 0 1000 10000 --corpus 1 4 16 --out bench_results.json
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(APP_DIR, "test.py")
+STAGES = ("prompt_build", "llm_call", "sheets_write", "notion_write", "total")
+DELIVER_STAGES = {"Google Sheets": "sheets_write", "Notion": "notion_write"}
+
+# 背景補題會跟量測搶時間，先關掉；快取與 outbox 放在暫存目錄
+_tmp = tempfile.mkdtemp(prefix="cgai-bench-")
+os.environ.setdefault("QUESTION_POOL_WATERMARK", "0")
+os.environ.setdefault("QUESTION_POOL_PATH", os.path.join(_tmp, "question_pool.json"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_tmp, "llm_cache.db"))
+# 各情境的題目與擬答都一樣，開著批改快取後面的情境會直接命中，llm_call 就沒得比
+os.environ.setdefault("FEEDBACK_CACHE_TTL", "0")
+os.environ.setdefault("OUTBOX_PATH", os.path.join(_tmp, "outbox.db"))
+os.environ.setdefault("METRICS_LOG", os.path.join(_tmp, "metrics.jsonl"))
+sys.path.insert(0, APP_DIR)
+
+import instrument  # noqa: E402
+import law_index  # noqa: E402
+import notion  # noqa: E402
+import outbox  # noqa: E402
+import resources  # noqa: E402
+import sheets  # noqa: E402
+from fakes import Faults, FakeGroq, FakeGspread, FakeNotionSession  # noqa: E402
+from laws import law_database  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+
+def percentile(values, p):
+    # nearest-rank
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(p / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    return {
+        "n": len(values),
+        "p50_ms": _ms(percentile(values, 50)),
+        "p95_ms": _ms(percentile(values, 95)),
+        "p99_ms": _ms(percentile(values, 99)),
+        "mean_ms": _ms(sum(values) / len(values)) if values else None,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+
+
+def scaled_corpus(multiplier):
+    # 把每科條文複製 multiplier 份 (條號往後推)，模擬語料變大
+    if multiplier <= 1:
+        return dict(law_database)
+    scaled = {}
+    for subject, text in law_database.items():
+        copies = [text] + [_shift_articles(text, 1000 * i) for i in range(1, multiplier)]
+        scaled[subject] = "\n".join(copies)
+    return scaled
+
+
+def _shift_articles(text, offset):
+    lines = []
+    for line in text.splitlines():
+        m = law_index.ARTICLE_RE.match(line.strip())
+        if m:
+            main, dash_sub, zhi_sub, rest = m.groups()
+            sub = dash_sub or zhi_sub
+            line = f"第 {int(main) + offset}{'-' + sub if sub else ''} 條{rest}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.recorder = None
+        self.groq = None
+        self.notion_session = None
+        self._patch()
+
+    def _patch(self):
+        # 在 app 執行前換掉客戶端；test.py 每次 rerun 都會重新 from resources import，所以拿到的是這裡的版本
+        harness = self
+        resources.get_groq_client = lambda api_key: harness.groq
+        resources.get_notion_session = lambda: harness.notion_session
+        instrument.add_listener(self._on_event)
+
+    def _on_event(self, event):
+        # 各階段耗時直接吃 app 自己 emit 的 span；失敗的不算進延遲 (另外算在 app_errors / deliveries)
+        if self.recorder is None or event.get("error"):
+            return
+        name = event["name"]
+        if name == "deliver" and event.get("outcome") == "delivered":
+            name = DELIVER_STAGES.get(event["sink"])
+        if name in STAGES:
+            self.recorder.add(name, event["duration_ms"] / 1000)
+
+    def scenario(self, sheet_rows, corpus_multiplier):
+        args = self.args
+        self.recorder = Recorder()
+        self.groq = FakeGroq(
+            ["情境：海巡人員於港口登檢可疑漁船，請依刑事訴訟法分析搜索扣押之合法性。", "評分：75 分。建議補充第131條逕行搜索要件。"],
+            first_token_delay=args.llm_latency, chunk_delay=args.chunk_delay, fail_rate=args.llm_fail_rate,
+        )
+        self.notion_session = FakeNotionSession(Faults(args.notion_latency, args.notion_fail_rate, seed=2))
+        gspread = FakeGspread(rows=[["x"] * 5] * sheet_rows, faults=Faults(args.sheets_latency, args.sheets_fail_rate, seed=1))
+        sheets.set_sheet_writer(sheets.BatchWriter(sheets.SheetHandle({}, connect=gspread.connect)))
+        box = outbox.Outbox(
+            {
+                "Google Sheets": sheets.sheet_sink(None),
+                "Notion": notion.notion_sink("bench", "bench-db", lambda: self.notion_session),
+            },
+            path=os.path.join(tempfile.mkdtemp(dir=_tmp), "outbox.db"),
+            base_delay=args.retry_delay,
+        )
+        outbox.set_outbox(box)
+
+        import laws
+
+        laws.law_database = scaled_corpus(corpus_multiplier)
+        at = AppTest.from_file(APP_FILE, default_timeout=120)
+        at.secrets["GROQ_API_KEY"] = "bench"
+        at.run()
+        errors = 0
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            at.button[0].click().run()
+            submit = [b for b in at.button if b.label.startswith("📝")]
+            if at.exception or not submit:
+                errors += 1
+                continue
+            at.text_area[0].input(f"第{i}次擬答：依刑事訴訟法第131條，檢察官得逕行搜索。")
+            submit[0].click().run()
+            if at.exception:
+                errors += 1
+                continue
+            box.wait_idle(timeout=120, poll=0.002)
+            self.recorder.add("total", time.perf_counter() - start)
+        laws.law_database = law_database
+        return {
+            "sheet_rows": sheet_rows,
+            "corpus_multiplier": corpus_multiplier,
+            "corpus_articles": sum(len(law_index.parse_articles(t)) for t in scaled_corpus(corpus_multiplier).values()),
+            "app_errors": errors,
+            "deliveries": box.status(),
+            "stages": {stage: summarize(self.recorder.samples[stage]) for stage in STAGES},
+        }
+
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端延遲量測 (本機假後端)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--sheet-rows", type=int, nargs="+", default=[0, 1000, 10000])
+    parser.add_argument("--corpus", type=int, nargs="+", default=[1, 4, 16], help="語料放大倍數")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="假 Groq 首字延遲 (秒)")
+    parser.add_argument("--chunk-delay", type=float, default=0.001)
+    parser.add_argument("--sheets-latency", type=float, default=0.02)
+    parser.add_argument("--notion-latency", type=float, default=0.03)
+    parser.add_argument("--llm-fail-rate", type=float, default=0.0)
+    parser.add_argument("--sheets-fail-rate", type=float, default=0.0)
+    parser.add_argument("--notion-fail-rate", type=float, default=0.0)
+    parser.add_argument("--retry-delay", type=float, default=0.05, help="outbox 重試基準延遲 (秒)")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    # 注入的失敗會被 Streamlit 當成未處理例外印出整段 traceback，量測時不需要
+    logging.getLogger("streamlit.error_util").disabled = True
+    harness = Harness(args)
+    results = []
+    for rows in args.sheet_rows:
+        for multiplier in args.corpus:
+            result = harness.scenario(rows, multiplier)
+            results.append(result)
+            stages = result["stages"]
+            print(
+                f"rows={rows:>6} corpus×{multiplier:<3} "
+                + "  ".join(f"{s} p50={stages[s]['p50_ms']}ms p95={stages[s]['p95_ms']}ms" for s in STAGES if stages[s]["n"])
+            )
+    report = {
+        "git_rev": git_rev(),
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "params": vars(args),
+        "scenarios": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# bench_citations.py - 本機引用條文檢查的吞吐量，以及實際送出的閱卷 prompt 比原本帶法條全文的模板省多少 token
+# 用法：python bench_citations.py --answers 5000 --out bench_citations.json
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from citations import LAW_ALIASES, get_checker  # noqa: E402
+from law_index import estimate_tokens, retrieve  # noqa: E402
+from laws import law_database  # noqa: E402
+from prompts import LAW_TOKEN_BUDGET, LAW_TOP_K, feedback_prompt  # noqa: E402
+
+FILLER = "本題涉及基本權之限制，應依法律保留原則審查，並兼顧比例原則與正當法律程序。"
+
+
+def _cite(article, rng):
+    # 隨機挑一種寫法：簡稱 / 全名 / 不寫法名、之1 / -1、有無空白
+    names = [article.law] + [alias for alias, name in LAW_ALIASES.items() if name == article.law] + [""]
+    main, _, sub = article.number.partition("-")
+    if sub:
+        number = rng.choice([f"第{main}條之{sub}", f"第 {main}-{sub} 條"])
+    else:
+        number = rng.choice([f"第{main}條", f"第 {main} 條"])
+    return rng.choice(names) + number
+
+
+def make_cases(n, seed=0):
+    rng = random.Random(seed)
+    subjects = [s for s in law_database if len(law_database.index(s))]
+    cases = []
+    for _ in range(n):
+        subject = rng.choice(subjects)
+        articles = law_database.index(subject).articles
+        asked = rng.sample(articles, min(2, len(articles)))
+        question = f"試述{_cite(asked[0], rng)}之要件。" if rng.random() < 0.7 else f"試述{asked[0].heading or '相關規定'}。"
+        cited = [_cite(a, rng) for a in rng.sample(articles, min(rng.randint(0, 4), len(articles)))]
+        if rng.random() < 0.2:
+            cited.append(f"第{rng.randint(900, 999)}條")  # 誤引
+        parts = [FILLER] * rng.randint(3, 12) + [f"依{c}，" for c in cited]
+        rng.shuffle(parts)
+        cases.append((subject, question, "".join(parts)))
+    return cases
+
+
+def run(n, repeat):
+    checker = get_checker(law_database)
+    cases = make_cases(n)
+    checker.check(*cases[0])  # 先建好查詢表
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for case in cases:
+            checker.check(*case)
+        rounds.append((time.perf_counter() - start) / n)
+    # 比較對象：加入本機檢查之前、帶 BM25 法條全文的閱卷模板
+    prompt_tokens, statute_tokens = [], []
+    for subject, question, answer in cases:
+        statutes = retrieve(law_database, subject, question + "\n" + answer, k=LAW_TOP_K, token_budget=LAW_TOKEN_BUDGET)
+        statute_tokens.append(estimate_tokens(f"題目：{question}\n考生回答：{answer}\n參考法條：{statutes}\n任務：閱卷評分並給予精確的申論建議。"))
+        prompt_tokens.append(feedback_prompt(law_database, subject, question, answer).tokens)
+    saved = [old - new for old, new in zip(statute_tokens, prompt_tokens)]
+    per_check = statistics.median(rounds)
+    return {
+        "answers": n,
+        "repeat": repeat,
+        "us_per_check_p50": round(per_check * 1e6, 1),
+        "checks_per_s": round(1 / per_check),
+        "statute_prompt_tokens_mean": round(statistics.fmean(statute_tokens), 1),
+        "grading_prompt_tokens_mean": round(statistics.fmean(prompt_tokens), 1),
+        "prompt_tokens_saved_mean": round(statistics.fmean(saved), 1),
+        "prompt_tokens_saved_min": min(saved),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--answers", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+    result = run(args.answers, args.repeat)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# bench_prompts.py - 新版 prompt 組法每次呼叫比舊版模板省多少 token (本機粗估)，以及組 prompt 本身的耗時
+# 用法：python bench_prompts.py --answers 2000 --out bench_prompts.json
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_citations import FILLER, make_cases  # noqa: E402
+from laws import law_database  # noqa: E402
+from prompts import feedback_prompt, question_prompt  # noqa: E402
+
+
+def summarize(builds, elapsed):
+    saved = [b.saved for b in builds]
+    return {
+        "calls": len(builds),
+        "us_per_build_p50": round(statistics.median(elapsed) * 1e6, 1),
+        "baseline_tokens_mean": round(statistics.fmean(b.baseline_tokens for b in builds), 1),
+        "prompt_tokens_mean": round(statistics.fmean(b.tokens for b in builds), 1),
+        "tokens_saved_mean": round(statistics.fmean(saved), 1),
+        "tokens_saved_p50": statistics.median(saved),
+        "tokens_saved_min": min(saved),
+        "tokens_saved_max": max(saved),
+        "trimmed_calls": sum(1 for b in builds if b.trimmed),
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    build = fn(*args)
+    return build, time.perf_counter() - start
+
+
+def run(n, long_ratio, seed=0):
+    rng = random.Random(seed)
+    cases = make_cases(n, seed)
+    # 一部分擬答拉長到超過擬答預算，看截短省下多少
+    cases = [(s, q, a + FILLER * 150 if rng.random() < long_ratio else a) for s, q, a in cases]
+    result = {}
+    for kind, calls in (
+        ("question", [(question_prompt, law_database, s, random.Random(i)) for i, (s, _, _) in enumerate(cases)]),
+        ("feedback", [(feedback_prompt, law_database, s, q, a) for s, q, a in cases]),
+    ):
+        timings = [timed(fn, *args) for fn, *args in calls]
+        result[kind] = summarize([b for b, _ in timings], [t for _, t in timings])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--answers", type=int, default=2000)
+    parser.add_argument("--long-ratio", type=float, default=0.1, help="超長擬答的比例")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+    result = run(args.answers, args.long_ratio)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
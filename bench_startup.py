@@ -0,0 +1,88 @@
+# bench_startup.py - 量測開頁冷啟動與 rerun 時間，可以跟某個 git 版本比較
+# 用法：python bench_startup.py --rev <舊版 commit> --reruns 20 --out bench_startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ("groq", "gspread", "oauth2client", "requests", "google.generativeai", "openai")
+APP_FILE = "test.py"
+
+
+def worker(app_dir, reruns):
+    # 在乾淨的 interpreter 裡跑：第一次 run = 冷啟動，之後每次 run = 使用者點一下造成的 rerun
+    sys.path.insert(0, app_dir)
+    os.chdir(tempfile.mkdtemp())
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    streamlit_import = time.perf_counter() - start
+    at = AppTest.from_file(os.path.join(app_dir, APP_FILE), default_timeout=60)
+    at.secrets["GROQ_API_KEY"] = "bench"
+    start = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - start
+    if at.exception:
+        raise SystemExit(f"app 執行失敗：{at.exception}")
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    return {
+        "streamlit_import_s": streamlit_import,
+        "cold_first_run_s": cold,
+        "rerun_p50_s": statistics.median(times),
+        "rerun_mean_s": statistics.fmean(times),
+        "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+
+
+def run_worker(app_dir, reruns):
+    env = dict(os.environ, QUESTION_POOL_WATERMARK="0")
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", app_dir, "--reruns", str(reruns)],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def checkout(rev, dest):
+    archive = subprocess.run(["git", "archive", rev], capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", dest], input=archive, check=True)
+    return dest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="開頁冷啟動 / rerun 時間量測")
+    parser.add_argument("--rev", help="要比較的舊版 git commit (例如 baseline)")
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3, help="每個版本跑幾個新 process，取中位數")
+    parser.add_argument("--out", default="bench_startup.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.reruns)))
+        return
+
+    targets = {"current": os.path.dirname(os.path.abspath(__file__))}
+    if args.rev:
+        targets[args.rev] = checkout(args.rev, tempfile.mkdtemp())
+    results = {}
+    for name, app_dir in targets.items():
+        runs = [run_worker(app_dir, args.reruns) for _ in range(args.repeat)]
+        results[name] = {key: statistics.median(r[key] for r in runs) for key in runs[0] if key.endswith("_s")}
+        results[name]["heavy_modules_loaded"] = runs[-1]["heavy_modules_loaded"]
+    for name, r in results.items():
+        print(f"{name:>12}: 冷啟動 {r['cold_first_run_s'] * 1000:7.1f} ms  rerun p50 {r['rerun_p50_s'] * 1000:6.1f} ms  載入 {', '.join(r['heavy_modules_loaded']) or '-'}")
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+# citations.py - 本機引用條文檢查：從題目與擬答抓出「刑事訴訟法第131條之1」「第 133-1 條」這類引用，
+# 對照法規資料庫算出涵蓋率與引用錯誤，結果取代整包法條原文交給 Groq 閱卷
+import re
+import time
+from dataclasses import dataclass, field
+
+from law_index import normalize_number, subject_index
+
+# 常見簡稱 -> 資料庫裡的法規名稱
+LAW_ALIASES = {
+    "刑法": "中華民國刑法",
+    "刑訴": "刑事訴訟法",
+    "刑訴法": "刑事訴訟法",
+    "海巡法": "海岸巡防法",
+    "器械條例": "海岸巡防機關器械使用條例",
+    "器械使用條例": "海岸巡防機關器械使用條例",
+}
+# 沒寫法規名稱時題目可能推薦的條文數
+EXPECTED_TOP_K = 3
+ARTICLE_EXCERPT = 90  # 交給 Groq 的條文摘錄字數
+
+_DIGITS = {"〇": 0, "零": 0, "一": 1, "二": 2, "兩": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_UNITS = {"十": 10, "百": 100, "千": 1000}
+_NUM = r"[0-9０-９〇零一二兩三四五六七八九十百千]+"
+# 資料庫沒收錄的法規名稱 (例如「民法第184條」)：條號前面緊接、以法規字尾結尾的一串中文字
+_OTHER_LAW_RE = re.compile(r"([㐀-鿿]+)\s*$")
+_OTHER_LAW_WINDOW = 12
+_OTHER_LAW_MAX = 10  # 沒有引導詞時，超過這個長度就不當整串都是法規名稱
+_LAW_SUFFIXES = ("條例", "規則", "辦法", "細則", "法")
+# 法規名稱前常見的動詞 / 介詞：名稱從最後一個之後算起 (「甲違反憲法」-> 憲法)
+_LEAD_IN_RE = re.compile(r"依照|依據|依|按|違反|參照|參酌|適用|準用|觸犯|根據|援引")
+
+
+def parse_number(text):
+    # "131" / "１３１" / "一百三十一" -> 131
+    text = text.translate(str.maketrans("０１２３４５６７８９", "0123456789"))
+    if text.isdigit():
+        return int(text)
+    total, digit = 0, 0
+    for ch in text:
+        if ch in _DIGITS:
+            digit = _DIGITS[ch]
+        else:
+            total += (digit or 1) * _UNITS[ch]
+            digit = 0
+    return total + digit
+
+
+@dataclass(slots=True)
+class Citation:
+    law: str  # 正規化後的法規名稱；沒寫就是 ""
+    number: str  # 正規化條號，例如 "131-1"
+    raw: str  # 原文寫法
+    source: str  # "question" / "answer"
+    status: str = ""  # ok / wrong_law (條號在別部法規) / not_found (全文收錄卻查無) / unverifiable (沒收這部法規或只有節錄)
+    article: object = None
+
+    @property
+    def label(self):
+        return f"{self.law}第{self.number}條"
+
+
+@dataclass
+class CitationReport:
+    subject: str
+    question_citations: list = field(default_factory=list)
+    answer_citations: list = field(default_factory=list)
+    expected: list = field(default_factory=list)  # 應該引用的 Article
+    expected_from_question: bool = True  # False = 題目沒寫條號，用 BM25 推估
+    covered: list = field(default_factory=list)
+    missing: list = field(default_factory=list)
+
+    @property
+    def coverage(self):
+        return len(self.covered) / len(self.expected) if self.expected else None
+
+    @property
+    def misquotes(self):
+        return [c for c in self.answer_citations if c.status in ("wrong_law", "not_found")]
+
+    def to_prompt(self):
+        # 給閱卷 prompt 用的精簡結論 (取代整包法條原文)
+        lines = []
+        if self.expected:
+            lines.append("應引用條文 (題目指定)：" if self.expected_from_question else "可能相關條文 (依題意推估)：")
+            covered = {id(a) for a in self.covered}
+            for article in self.expected:
+                mark = "✓ 已引用" if id(article) in covered else "✗ 未引用"
+                lines.append(f"- 【{article.law}】{_excerpt(article)} {mark}")
+            lines.append(self._coverage_line())
+        return "\n".join(lines + self._citation_lines())
+
+    def expected_prompt(self):
+        # 應引用條文的摘錄 (只跟題目有關)；prompts.feedback_prompt 放在 prompt 最前面，同一題的 prefix 才會一樣
+        if not self.expected:
+            return ""
+        lines = ["應引用條文 (題目指定)：" if self.expected_from_question else "可能相關條文 (依題意推估)："]
+        lines += [f"[{i}] 【{a.law}】{_excerpt(a)}" for i, a in enumerate(self.expected, 1)]
+        return "\n".join(lines)
+
+    def findings_prompt(self):
+        # 跟擬答有關的結論，配合 expected_prompt() 用編號對應條文
+        lines = []
+        if self.expected:
+            covered = {id(a) for a in self.covered}
+            marks = "、".join(f"[{i}] {'✓' if id(a) in covered else '✗ 未引用'}" for i, a in enumerate(self.expected, 1))
+            lines.append(f"{marks}｜{self._coverage_line()}")
+        return "\n".join(lines + self._citation_lines())
+
+    def _coverage_line(self):
+        label = "涵蓋率" if self.expected_from_question else "推估涵蓋率"
+        return f"{label}：{len(self.covered)}/{len(self.expected)}"
+
+    def _citation_lines(self):
+        if not self.answer_citations:
+            return ["考生引用：無明確條號"]
+        lines = ["考生引用："]
+        listed = {id(a) for a in self.expected}
+        for c in _unique_citations(self.answer_citations):
+            if c.status == "ok" and id(c.article) in listed:
+                lines.append(f"- {c.raw} ✓")
+            elif c.status == "ok":
+                listed.add(id(c.article))
+                lines.append(f"- {c.raw} → 【{c.article.law}】{_excerpt(c.article)}")
+            elif c.status == "wrong_law":
+                lines.append(f"- ⚠️ {c.raw}：該條號不在所寫法規，應為【{c.article.law}】第{c.number}條")
+            elif c.status == "not_found":
+                lines.append(f"- ⚠️ {c.raw}：法規資料庫查無此條，可能誤引")
+            else:
+                lines.append(f"- {c.raw} (資料庫未收錄該法規或該條，無法核對)")
+        return lines
+
+
+def _other_law(text, end):
+    # 回傳 (法規名稱, 名稱起點)；前面不是法規名稱就回傳 None
+    window_start = max(0, end - _OTHER_LAW_WINDOW)
+    m = _OTHER_LAW_RE.search(text, window_start, end)
+    if m is None:
+        return None
+    run, start = m.group(1), m.start(1)
+    suffix = next((x for x in _LAW_SUFFIXES if run.endswith(x)), None)
+    if suffix is None:
+        return None
+    # 從最後一個引導詞之後切；切完至少要剩「一個字 + 字尾」(「涉外民事法律適用法」不能切成「法」)
+    for lead in reversed(list(_LEAD_IN_RE.finditer(run))):
+        if len(run) - lead.end() > len(suffix):
+            return run[lead.end() :], start + lead.end()
+    if _LEAD_IN_RE.match(run):
+        return None  # 「依法第5條」
+    if (start == window_start and start > 0) or len(run) > _OTHER_LAW_MAX:
+        # 找不到名稱起點 (整個視窗都是中文字，或長得不像法規名稱)：只取最短的「一個字 + 字尾」
+        cut = len(run) - len(suffix) - 1
+        return run[cut:], start + cut
+    return run, start
+
+
+def _unique_citations(citations):
+    seen, result = set(), []
+    for c in citations:
+        if (c.law, c.number, c.status) not in seen:
+            seen.add((c.law, c.number, c.status))
+            result.append(c)
+    return result
+
+
+def _excerpt(article):
+    body = "".join(para for para, _ in article.paragraphs)
+    head = f"{article.label}（{article.heading}）" if article.heading else article.label
+    return head + "：" + (body[:ARTICLE_EXCERPT] + "…" if len(body) > ARTICLE_EXCERPT else body)
+
+
+class CitationChecker:
+    # 每科一份條號查詢表；法規檔重新載入 (索引換了) 才重建
+    def __init__(self, law_database, aliases=LAW_ALIASES):
+        self.law_database = law_database
+        self.aliases = dict(aliases)
+        self._tables = {}  # subject -> (LawIndex, {(law, number): Article}, {number: [Article]}, {本科法規名稱})
+        self._snapshot_key = None
+        self._pattern = None
+        self._all = {}  # 所有科目的 {(law, number): Article}
+        self._laws = set()  # 資料庫收錄的法規名稱
+        self._complete = frozenset()  # 收錄全文的法規 (只有這些查不到才算誤引)
+        # 跟 LawCorpus 檢查檔案的頻率一致；dict 版資料庫不會變，0 = 每次都比對
+        self._refresh_interval = getattr(law_database, "check_interval", 0)
+        self._refreshed_at = 0.0
+
+    def _table(self, subject):
+        index = subject_index(self.law_database, subject)
+        cached = self._tables.get(subject)
+        if cached is None or cached[0] is not index:
+            by_key, by_number = {}, {}
+            for article in index.articles:
+                by_key[(article.law, article.number)] = article
+                by_number.setdefault(article.number, []).append(article)
+            cached = self._tables[subject] = (index, by_key, by_number, {law for law, _ in by_key})
+        return cached
+
+    def _refresh(self):
+        # 先確認各科索引還是同一份；有變才重編 regex 與全資料庫查詢表
+        now = time.monotonic()
+        if self._pattern is not None and now - self._refreshed_at < self._refresh_interval:
+            return
+        self._refreshed_at = now
+        self._complete = getattr(self.law_database, "complete_laws", frozenset())
+        tables = [self._table(subject) for subject in self.law_database]
+        key = tuple(id(table[0]) for table in tables)
+        if key != self._snapshot_key:
+            self._all = {k: a for table in tables for k, a in table[1].items()}
+            self._laws = {law for law, _ in self._all if law}
+            names = self._laws | set(self.aliases)
+            alternation = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+            self._pattern = re.compile(
+                rf"(?:({alternation}|同法|同條例)\s*)?第\s*({_NUM})\s*(?:-\s*({_NUM})\s*)?條(?:\s*之\s*({_NUM}))?"
+            )
+            self._snapshot_key = key
+
+    def extract(self, text, source="answer"):
+        if self._pattern is None:
+            self._refresh()
+        return self._extract(text, source)
+
+    def _extract(self, text, source):
+        citations = []
+        previous = ""
+        text = text or ""
+        for m in self._pattern.finditer(text):
+            name, main, dash_sub, zhi_sub = m.groups()
+            start = m.start()
+            if name in ("同法", "同條例"):
+                law = previous
+            elif name is None and (other := _other_law(text, m.start())):
+                law, start = other
+                law = "" if law.endswith("本法") else law
+            else:
+                law = self.aliases.get(name, name or "")
+                previous = law or previous
+            sub = dash_sub or zhi_sub
+            number = normalize_number(parse_number(main), parse_number(sub) if sub else None)
+            citations.append(Citation(law, number, text[start : m.end()].strip(), source))
+        return citations
+
+    def resolve(self, citation, subject):
+        _, by_key, by_number, laws = self._tables[subject]
+        if not citation.law:
+            hits = by_number.get(citation.number)
+            if hits:
+                citation.status, citation.article = "ok", hits[0]
+            else:
+                citation.status = "not_found" if laws and laws <= self._complete else "unverifiable"
+            return citation
+        # 本科沒有就找其他科目 (例如刑訴題目引用刑法)
+        article = by_key.get((citation.law, citation.number)) or self._all.get((citation.law, citation.number))
+        if article is not None:
+            citation.status, citation.article = "ok", article
+        elif citation.law not in self._complete:
+            # 沒收錄這部法規，或只有節錄 (真實存在的條文也可能查不到)
+            citation.status = "unverifiable"
+        elif by_number.get(citation.number):
+            citation.status, citation.article = "wrong_law", by_number[citation.number][0]
+        else:
+            citation.status = "not_found"
+        return citation
+
+    def article_keys(self, subject, text):
+        # 文字裡引用的條文 -> {"刑事訴訟法第131-1條", ...}；資料庫查不到的照寫法記 (法規名稱 + 條號)
+        self._refresh()
+        citations = self._extract(text, "")
+        if subject in self._tables:
+            citations = [self.resolve(c, subject) for c in citations]
+        return {c.article.key if c.status == "ok" else c.label for c in citations}
+
+    def check(self, subject, question, answer):
+        self._refresh()
+        report = CitationReport(subject)
+        if subject not in self._tables:
+            return report
+        report.question_citations = [self.resolve(c, subject) for c in self._extract(question, "question")]
+        report.answer_citations = [self.resolve(c, subject) for c in self._extract(answer, "answer")]
+        expected = _unique(c.article for c in report.question_citations if c.status == "ok")
+        if not expected:
+            index = self._tables[subject][0]
+            expected = [article for _, article in index.search(question, EXPECTED_TOP_K)]
+            report.expected_from_question = False
+        cited = {id(c.article) for c in report.answer_citations if c.status == "ok"}
+        report.expected = expected
+        report.covered = [a for a in expected if id(a) in cited]
+        report.missing = [a for a in expected if id(a) not in cited]
+        return report
+
+
+def _unique(articles):
+    seen, result = set(), []
+    for article in articles:
+        if id(article) not in seen:
+            seen.add(id(article))
+            result.append(article)
+    return result
+
+
+# 整個 process 共用 (每個 law_database 一份)
+_checkers = {}
+
+
+def get_checker(law_database):
+    checker = _checkers.get(id(law_database))
+    if checker is None or checker.law_database is not law_database:
+        checker = _checkers[id(law_database)] = CitationChecker(law_database)
+    return checker
+
+
+def check_citations(law_database, subject, question, answer):
+    return get_checker(law_database).check(subject, question, answer)
+
@@ -0,0 +1,194 @@
+# fakes.py - 本機假後端 (不連網路)，用來數 API 呼叫次數與跑 benchmark
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+
+class FakeError(RuntimeError):
+    pass
+
+
+class FakeStatusError(FakeError):
+    # 跟 groq.APIStatusError 一樣有 status_code 與 response.headers
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"fake HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class FakeTimeoutError(FakeError):
+    pass
+
+
+class Faults:
+    # 延遲與失敗注入：每次呼叫先睡 latency 秒，再以 fail_rate 的機率失敗
+    def __init__(self, latency=0.0, fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def hit(self, extra_latency=0.0):
+        if self.latency or extra_latency:
+            time.sleep(self.latency + extra_latency)
+        with self._lock:
+            return self.fail_rate and self._rng.random() < self.fail_rate
+
+
+class FakeWorksheet:
+    # read_latency_per_row 模擬整張表讀取隨列數變慢 (get_all_values)
+    def __init__(self, rows=None, faults=None, read_latency_per_row=0.0):
+        self.rows = [list(r) for r in rows or []]
+        self.calls = Counter()
+        self.ranges = []  # get_values 讀過的範圍
+        self.faults = faults or Faults()
+        self.read_latency_per_row = read_latency_per_row
+
+    def _call(self, name, extra_latency=0.0):
+        self.calls[name] += 1
+        if self.faults.hit(extra_latency):
+            raise FakeError(f"fake gspread {name} 失敗")
+
+    def row_values(self, index):
+        self._call("row_values")
+        return list(self.rows[index - 1]) if index <= len(self.rows) else []
+
+    def get_values(self, range_name=None, **kwargs):
+        # 只支援 "A{起始列}:E" 這種寫法 (歷史紀錄增量同步用)
+        self._call("get_values")
+        start = int(range_name.split(":")[0][1:]) if range_name else 1
+        self.ranges.append(range_name)
+        return [list(r) for r in self.rows[start - 1 :]]
+
+    def get_all_values(self):
+        self._call("get_all_values", self.read_latency_per_row * len(self.rows))
+        return [list(r) for r in self.rows]
+
+    def append_row(self, row, **kwargs):
+        self._call("append_row")
+        self.rows.append(list(row))
+
+    def append_rows(self, rows, **kwargs):
+        self._call("append_rows")
+        self.rows.extend(list(r) for r in rows)
+
+
+class FakeSpreadsheet:
+    def __init__(self, spreadsheet_id, worksheet):
+        self.id = spreadsheet_id
+        self.sheet1 = worksheet
+
+
+class FakeGspread:
+    # 用法：get_sheet_writer(secret, connect=FakeGspread().connect)
+    def __init__(self, rows=None, sheet_name="海巡特考練習紀錄", faults=None, read_latency_per_row=0.0):
+        self.worksheet = FakeWorksheet(rows, faults, read_latency_per_row)
+        self.spreadsheet = FakeSpreadsheet("fake-spreadsheet-id", self.worksheet)
+        self.sheet_name = sheet_name
+        self.calls = Counter()
+
+    def connect(self, key_dict):
+        self.calls["authorize"] += 1
+        return self, None
+
+    def open(self, name):
+        self.calls["open"] += 1
+        if name != self.sheet_name:
+            raise KeyError(name)
+        return self.spreadsheet
+
+    def open_by_key(self, key):
+        self.calls["open_by_key"] += 1
+        return self.spreadsheet
+
+
+def _chunk(content, model):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=None)], model=model)
+
+
+def _usage(messages, reply):
+    # 粗估 token 數 (一字一 token)，欄位跟 Groq 回傳的 usage 一樣
+    prompt_tokens = sum(len(m["content"]) for m in messages)
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens, completion_tokens=len(reply), total_tokens=prompt_tokens + len(reply),
+        queue_time=0.0, prompt_time=0.0, completion_time=0.0, total_time=0.0,
+    )
+
+
+class FakeGroq:
+    # 模擬 Groq client：照腳本回答，可設定首字延遲與每段間隔
+    # errors：依序先丟出的例外 (例如 [FakeStatusError(429, retry_after=1)])；model_delays：各模型的首字延遲
+    def __init__(self, replies=("這是一段假回覆。",), first_token_delay=0.0, chunk_delay=0.0, chunk_size=4, fail_rate=0.0, seed=0,
+                 errors=(), model_delays=None):
+        self.replies = list(replies)
+        self.errors = list(errors)
+        self.model_delays = model_delays or {}
+        self.faults = Faults(fail_rate=fail_rate, seed=seed)
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _next_reply(self):
+        return self.replies[(len(self.requests) - 1) % len(self.replies)]
+
+    def _create(self, messages, model, stream=False, **params):
+        self.requests.append({"messages": messages, "model": model, "stream": stream, **params})
+        if self.errors:
+            raise self.errors.pop(0)
+        if self.faults.hit():
+            raise FakeError("fake groq 失敗")
+        delay = self.model_delays.get(model, self.first_token_delay)
+        timeout = params.get("timeout")
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise FakeTimeoutError(f"fake groq {model} 逾時")
+        reply = self._next_reply()
+        if stream:
+            return self._stream(reply, model, delay, _usage(messages, reply))
+        time.sleep(delay + self.chunk_delay * (len(reply) // self.chunk_size))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=reply), finish_reason="stop")],
+            model=model,
+            usage=_usage(messages, reply),
+        )
+
+    def _stream(self, reply, model, delay, usage):
+        time.sleep(delay)
+        for i in range(0, len(reply), self.chunk_size):
+            if i:
+                time.sleep(self.chunk_delay)
+            yield _chunk(reply[i : i + self.chunk_size], model)
+        yield SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")],
+            model=model,
+            x_groq=SimpleNamespace(usage=usage),
+        )
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return {}
+
+
+class FakeNotionSession:
+    # 取代 requests.Session：記錄送出的 page，失敗時回 500
+    def __init__(self, faults=None):
+        self.faults = faults or Faults()
+        self.pages = []
+        self.calls = Counter()
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        self.calls["post"] += 1
+        if self.faults.hit():
+            return FakeResponse(500, "fake notion 失敗")
+        self.pages.append(json)
+        return FakeResponse(200)
@@ -0,0 +1,33 @@
+# grading.py - 閱卷 prompt 與呼叫 (網頁作答、批次閱卷共用，快取 key 也一樣)
+import os
+
+from instrument import span
+from llm import MODEL, CallStats, complete_chat
+from llm_cache import cache_key
+from prompts import feedback_prompt
+
+# 同一題同一份擬答的批改直接重用 (秒，0 = 不快取)
+FEEDBACK_CACHE_TTL = int(os.environ.get("FEEDBACK_CACHE_TTL", 7 * 24 * 3600))
+
+
+def feedback_messages(law_database, subject, question, answer):
+    with span("prompt_build", kind="feedback") as s:
+        build = feedback_prompt(law_database, subject, question, answer)
+        s.update(build.report())
+    return build.messages
+
+
+def grade(client, cache, law_database, subject, question, answer, kind="batch_feedback"):
+    # 不串流的一次批改 (批次閱卷用)；回傳 (批改內容, CallStats)
+    messages = feedback_messages(law_database, subject, question, answer)
+    stats = CallStats()
+    if cache is None or not FEEDBACK_CACHE_TTL:
+        return complete_chat(client, messages, stats=stats, kind=kind), stats
+    # 換成備援模型的批改不寫進快取 (快取 key 是主模型)
+    text, hit = cache.get_or_compute(
+        cache_key(MODEL, messages), lambda: complete_chat(client, messages, stats=stats, kind=kind), FEEDBACK_CACHE_TTL,
+        cacheable=lambda _: stats.model == MODEL,
+    )
+    if hit:
+        stats = CallStats(ttft=0.0, total=0.0, text=text, cached=True)
+    return text, stats
@@ -0,0 +1,227 @@
+# history.py - 練習紀錄本機副本 (SQLite)：從試算表增量同步 (只抓上次之後的新列)，弱點分析直接查本機
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from citations import get_checker
+from instrument import span
+from laws import law_database as default_law_database
+from sheets import HEADER
+
+HISTORY_PATH = os.environ.get("HISTORY_PATH", os.path.join("data", "history.db"))
+SYNC_INTERVAL = 60.0  # 背景同步最短間隔 (秒)
+SHEET_COLUMNS = "A{start}:E"
+# 1：條文改存「法規名稱第N條」(Article.key)，舊版只存條號，開啟時依本機紀錄重算
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS practice (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sheet_row INTEGER UNIQUE,
+    created_at TEXT NOT NULL,
+    date TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    feedback TEXT NOT NULL,
+    score REAL
+);
+CREATE INDEX IF NOT EXISTS practice_date ON practice(date);
+CREATE INDEX IF NOT EXISTS practice_subject_date ON practice(subject, date);
+CREATE TABLE IF NOT EXISTS citations (
+    practice_id INTEGER NOT NULL REFERENCES practice(id),
+    subject TEXT NOT NULL,
+    article TEXT NOT NULL,
+    in_answer INTEGER NOT NULL,
+    missed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS citations_article ON citations(article);
+CREATE INDEX IF NOT EXISTS citations_subject_article ON citations(subject, article);
+-- 側欄用的彙總表，寫入時順便更新，查詢量跟紀錄筆數無關
+CREATE TABLE IF NOT EXISTS daily_scores (
+    subject TEXT NOT NULL,
+    date TEXT NOT NULL,
+    total REAL NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (subject, date)
+);
+CREATE TABLE IF NOT EXISTS missed_counts (
+    subject TEXT NOT NULL,
+    article TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (subject, article)
+);
+CREATE INDEX IF NOT EXISTS missed_counts_n ON missed_counts(n);
+CREATE TABLE IF NOT EXISTS sync_state (
+    source TEXT PRIMARY KEY,
+    last_row INTEGER NOT NULL
+);
+"""
+
+# AI 建議裡的分數：「評分：75 分」「得分 80」「75/100」
+SCORE_RE = re.compile(r"(?:評分|分數|得分|總分)\D{0,4}?(\d{1,3}(?:\.\d+)?)|(\d{1,3}(?:\.\d+)?)\s*(?:分|/\s*100)")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_score(feedback):
+    for m in SCORE_RE.finditer(feedback or ""):
+        value = float(m.group(1) or m.group(2))
+        if value <= 100:
+            return value
+    return None
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_PATH, law_database=None):
+        self.path = path
+        # 條文用閱卷時同一套比對 (citations.CitationChecker)，弱點分析跟批改結果才對得起來
+        self.checker = get_checker(law_database if law_database is not None else default_law_database)
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0.0
+        self.last_error = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            if db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self._rebuild_citations(db)
+                db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def last_row(self, source="sheet"):
+        with self._connect() as db:
+            row = db.execute("SELECT last_row FROM sync_state WHERE source = ?", (source,)).fetchone()
+        return row["last_row"] if row else 0
+
+    def add_rows(self, rows, first_row, source="sheet"):
+        # rows 是試算表上從第 first_row 列開始的原始列 (時間, 科目, 題目, 擬答, AI 建議)
+        added = 0
+        with self._connect() as db:
+            for offset, row in enumerate(rows):
+                row = (list(row) + [""] * 5)[:5]
+                if row == HEADER or not any(row):
+                    continue
+                created_at, subject, question, answer, feedback = row
+                cur = db.execute(
+                    """INSERT OR IGNORE INTO practice (sheet_row, created_at, date, subject, question, answer, feedback, score)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (first_row + offset, created_at, created_at[:10], subject, question, answer, feedback, parse_score(feedback)),
+                )
+                if not cur.rowcount:
+                    continue
+                added += 1
+                self._add_citations(db, cur.lastrowid, subject, question, answer, feedback)
+                score = parse_score(feedback)
+                if score is not None:
+                    db.execute(
+                        """INSERT INTO daily_scores VALUES (?, ?, ?, 1)
+                           ON CONFLICT(subject, date) DO UPDATE SET total = total + excluded.total, n = n + 1""",
+                        (subject, created_at[:10], score),
+                    )
+            if rows:
+                db.execute(
+                    "INSERT INTO sync_state (source, last_row) VALUES (?, ?) ON CONFLICT(source) DO UPDATE SET last_row = excluded.last_row",
+                    (source, first_row + len(rows) - 1),
+                )
+        return added
+
+    def _add_citations(self, db, practice_id, subject, question, answer, feedback):
+        # 題目或 AI 建議提到、擬答卻沒寫到的條文算「漏答」
+        in_answer = self.checker.article_keys(subject, answer)
+        expected = self.checker.article_keys(subject, question) | self.checker.article_keys(subject, feedback)
+        db.executemany(
+            "INSERT INTO citations (practice_id, subject, article, in_answer, missed) VALUES (?, ?, ?, ?, ?)",
+            [(practice_id, subject, a, int(a in in_answer), int(a not in in_answer)) for a in sorted(in_answer | expected)],
+        )
+        db.executemany(
+            "INSERT INTO missed_counts VALUES (?, ?, 1) ON CONFLICT(subject, article) DO UPDATE SET n = n + 1",
+            [(subject, a) for a in sorted(expected - in_answer)],
+        )
+
+    def _rebuild_citations(self, db):
+        db.execute("DELETE FROM citations")
+        db.execute("DELETE FROM missed_counts")
+        for r in db.execute("SELECT id, subject, question, answer, feedback FROM practice").fetchall():
+            self._add_citations(db, r["id"], r["subject"], r["question"], r["answer"], r["feedback"])
+
+    def sync(self, worksheet):
+        # 只抓上次同步之後的列；回傳新增筆數
+        with self._sync_lock:
+            start = self.last_row() + 1
+            with span("history_sync", start_row=start) as s:
+                rows = worksheet.get_values(SHEET_COLUMNS.format(start=start))
+                s["rows"] = len(rows)
+                s["added"] = self.add_rows(rows, start)
+            self._last_sync = time.monotonic()
+            return s["added"]
+
+    def sync_async(self, get_worksheet, interval=SYNC_INTERVAL):
+        # 側欄用：太久沒同步就丟到背景做，畫面只查本機資料
+        if time.monotonic() - self._last_sync < interval or self._sync_lock.locked():
+            return False
+        self._last_sync = time.monotonic()
+
+        def run():
+            try:
+                self.sync(get_worksheet())
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"[:300]
+                logger.exception("練習紀錄同步失敗")
+
+        threading.Thread(target=run, name="history-sync", daemon=True).start()
+        return True
+
+    def count(self, subject=None):
+        with self._connect() as db:
+            if subject:
+                return db.execute("SELECT COUNT(*) FROM practice WHERE subject = ?", (subject,)).fetchone()[0]
+            return db.execute("SELECT COUNT(*) FROM practice").fetchone()[0]
+
+    def score_trend(self, subject=None, days=30):
+        # [{"日期", "平均分數", "練習次數"}]，最近 days 個有練習的日子，由舊到新
+        where, args = "", []
+        if subject:
+            where = "WHERE subject = ?"
+            args.append(subject)
+        with self._connect() as db:
+            rows = db.execute(
+                f"""SELECT date, SUM(total) / SUM(n) AS avg_score, SUM(n) AS n FROM daily_scores {where}
+                    GROUP BY date ORDER BY date DESC LIMIT ?""",
+                (*args, days),
+            ).fetchall()
+        return [{"日期": r["date"], "平均分數": round(r["avg_score"], 1), "練習次數": r["n"]} for r in reversed(rows)]
+
+    def most_missed(self, subject=None, limit=10):
+        where, args = "", []
+        if subject:
+            where = "WHERE subject = ?"
+            args.append(subject)
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT subject, article, n FROM missed_counts {where} ORDER BY n DESC, article LIMIT ?",
+                (*args, limit),
+            ).fetchall()
+        return [{"科目": r["subject"], "條文": r["article"], "漏答次數": r["n"]} for r in rows]
+
+
+# 整個 process 共用
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store(path=HISTORY_PATH):
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore(path)
+        return _store
@@ -0,0 +1,137 @@
+# instrument.py - 每次互動的各階段耗時、token 用量與成本；其他模組 (sinks 等) 用 emit() / span() 丟資料進來
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+# Groq 公開價 (美元 / 百萬 tokens)：(輸入, 輸出)
+PRICES = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+}
+# JSON-lines 紀錄檔 (設成空字串就不寫檔)
+METRICS_LOG = os.environ.get("METRICS_LOG", os.path.join("data", "metrics.jsonl"))
+ROLLING_WINDOW = 200  # 側欄面板每種事件保留最近幾筆
+
+logger = logging.getLogger(__name__)
+_listeners = []
+_trace = contextvars.ContextVar("trace", default=None)
+
+
+def add_listener(listener):
+    # listener(event: dict)；event 至少有 ts / name / duration_ms / trace
+    _listeners.append(listener)
+    return listener
+
+
+def remove_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def emit(name, duration, **attrs):
+    event = {"ts": round(time.time(), 3), "name": name, "duration_ms": round(duration * 1000, 3), "trace": _trace.get()}
+    event.update(attrs)
+    for listener in list(_listeners):
+        try:
+            listener(event)
+        except Exception:
+            logger.exception("instrument listener 失敗")
+    return event
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    # with span("llm_call", kind="feedback") as s: ...; s["prompt_tokens"] = 123
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        emit(name, time.perf_counter() - start, **attrs)
+
+
+@contextlib.contextmanager
+def trace(trace_id=None):
+    # 同一次互動 (出題 / 閱卷) 的 span 共用一個 trace id
+    trace_id = trace_id or uuid.uuid4().hex[:12]
+    token = _trace.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _trace.reset(token)
+
+
+def bind(fn):
+    # 丟給別的執行緒 (executor / Timer) 前先包起來，背景工作才會沿用同一個 trace id；每次提交都要重新 bind
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def cost_usd(model, prompt_tokens, completion_tokens):
+    price_in, price_out = PRICES.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * price_in + (completion_tokens or 0) * price_out) / 1_000_000
+
+
+class JsonlLogger:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def __call__(self, event):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class RollingStats:
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self._events = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self._events[event["name"]].append(event)
+
+    def summary(self):
+        rows = []
+        with self._lock:
+            snapshot = {name: list(events) for name, events in self._events.items()}
+        for name, events in sorted(snapshot.items()):
+            durations = sorted(e["duration_ms"] for e in events)
+            rows.append({
+                "事件": name,
+                "次數": len(events),
+                "p50 ms": durations[len(durations) // 2],
+                "p95 ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                "錯誤": sum(1 for e in events if e.get("error")),
+                "輸入 tokens": sum(e.get("prompt_tokens") or 0 for e in events),
+                "輸出 tokens": sum(e.get("completion_tokens") or 0 for e in events),
+                "prompt 省下 tokens": sum(e.get("tokens_saved") or 0 for e in events),
+                "成本 USD": round(sum(e.get("cost_usd") or 0 for e in events), 5),
+            })
+        return rows
+
+
+rolling_stats = add_listener(RollingStats())
+_jsonl_logger = None
+_setup_lock = threading.Lock()
+
+
+def setup(log_path=METRICS_LOG):
+    # 開啟 JSON-lines 紀錄 (整個 process 只開一次)
+    global _jsonl_logger
+    with _setup_lock:
+        if _jsonl_logger is None and log_path:
+            _jsonl_logger = add_listener(JsonlLogger(log_path))
+    return _jsonl_logger
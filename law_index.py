@@ -0,0 +1,201 @@
+# law_index.py - 法條逐條索引 + BM25 檢索 (只把相關法條塞進 prompt)
+import math
+import random
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+# 法規名稱：【海岸巡防法】
+LAW_NAME_RE = re.compile(r"^【(.+?)】\s*$")
+# 條號：第 1 條 / 第88條之1 / 第 133-1 條，後面可能接 (標題)：
+ARTICLE_RE = re.compile(r"^第\s*(\d+)\s*(?:-\s*(\d+)\s*)?條(?:之\s*(\d+))?(.*)$")
+# 題目/擬答裡引用的條號 (不限行首)
+CITE_RE = re.compile(r"第\s*(\d+)\s*(?:-\s*(\d+)\s*)?條(?:之\s*(\d+))?")
+# 項次：﹝1﹞ (有些同一行塞了好幾項)
+PARAGRAPH_RE = re.compile(r"﹝\d+﹞")
+# 款次：一、二、...
+ITEM_RE = re.compile(r"^[一二三四五六七八九十]+、")
+CJK_RE = re.compile(r"[㐀-鿿]+")
+WORD_RE = re.compile(r"[A-Za-z0-9]+")
+
+# BM25 參數
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+@dataclass(slots=True)
+class Article:
+    law: str
+    number: str  # 正規化條號，例如 "133-1"
+    label: str  # 原始寫法，例如 "第 133-1 條"
+    heading: str = ""
+    paragraphs: list = field(default_factory=list)  # [(項文字, [款, ...]), ...]
+
+    @property
+    def key(self):
+        return f"{self.law}第{self.number}條"
+
+    def text(self):
+        head = f"{self.label}（{self.heading}）" if self.heading else self.label
+        lines = [head]
+        numbered = len(self.paragraphs) > 1
+        for i, (para, items) in enumerate(self.paragraphs, 1):
+            if para:
+                lines.append(f"﹝{i}﹞{para}" if numbered else para)
+            lines.extend(items)
+        return "\n".join(lines)
+
+
+def normalize_number(main, sub=None):
+    return f"{int(main)}-{int(sub)}" if sub else str(int(main))
+
+
+def _clean_heading(rest):
+    heading = rest.strip().rstrip(":：").strip()
+    if heading[:1] in "(（" and heading[-1:] in ")）":
+        heading = heading[1:-1].strip()
+    elif heading[:1] in "(（":  # 例如 "（戒具之使用）＊立法理由"
+        heading = re.sub(r"[)）]", "", heading[1:], count=1).strip()
+    return heading
+
+
+def parse_articles(text, law=""):
+    # 把一大段法規文字切成逐條紀錄
+    return parse_lines(text.splitlines(), law)
+
+
+def parse_lines(lines, law=""):
+    # 逐行解析 (可以直接吃檔案/mmap 的行，不用先讀成一整段字串)
+    articles = []
+    current = None
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        m = LAW_NAME_RE.match(line)
+        if m:
+            law = m.group(1)
+            current = None
+            continue
+        m = ARTICLE_RE.match(line)
+        if m:
+            main, dash_sub, zhi_sub, rest = m.groups()
+            label = line[: len(line) - len(rest)].strip()
+            current = Article(law, normalize_number(main, dash_sub or zhi_sub), label, _clean_heading(rest))
+            articles.append(current)
+            continue
+        if current is None:
+            continue
+        if ITEM_RE.match(line) and current.paragraphs:
+            current.paragraphs[-1][1].append(line)
+            continue
+        for para in PARAGRAPH_RE.split(line):
+            para = para.strip()
+            if para:
+                current.paragraphs.append((para, []))
+    return articles
+
+
+def tokenize(text):
+    # 中文用字元 bigram，英數用整個單字
+    tokens = []
+    for run in CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    tokens.extend(w.lower() for w in WORD_RE.findall(text))
+    return tokens
+
+
+def estimate_tokens(text):
+    # 粗估：中文一字約一個 token，其餘約四個字元一個 token
+    cjk = sum(len(run) for run in CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class LawIndex:
+    def __init__(self, articles):
+        self.articles = list(articles)
+        self.postings = defaultdict(list)  # token -> [(doc_id, tf), ...]
+        self.doc_len = []
+        for doc_id, article in enumerate(self.articles):
+            counts = Counter(tokenize(f"{article.law} {article.heading} {article.text()}"))
+            counts[f"#{article.number}"] += 1
+            self.doc_len.append(sum(counts.values()))
+            for token, tf in counts.items():
+                self.postings[token].append((doc_id, tf))
+        self.avgdl = sum(self.doc_len) / len(self.doc_len) if self.doc_len else 0.0
+
+    def __len__(self):
+        return len(self.articles)
+
+    def search(self, query, k=5):
+        n = len(self.articles)
+        if not n:
+            return []
+        terms = Counter(tokenize(query))
+        for main, dash_sub, zhi_sub in CITE_RE.findall(query):
+            terms[f"#{normalize_number(main, dash_sub or zhi_sub)}"] += 1
+        scores = defaultdict(float)
+        for token, qtf in terms.items():
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc_id] / self.avgdl)
+                scores[doc_id] += qtf * idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:k]
+        return [(score, self.articles[doc_id]) for doc_id, score in ranked]
+
+
+# 每個科目一份索引，法規文字變了才重建
+_indexes = {}
+
+
+def subject_index(law_database, subject):
+    # laws.LawCorpus 自己管索引 (檔案變了才重建)；一般 dict 就用法規文字判斷要不要重建
+    if hasattr(law_database, "index"):
+        return law_database.index(subject)
+    return get_index(subject, law_database.get(subject, "查無資料"))
+
+
+def get_index(subject, law_text):
+    cached = _indexes.get(subject)
+    if cached is None or cached[0] != law_text:
+        cached = (law_text, LawIndex(parse_articles(law_text)))
+        _indexes[subject] = cached
+    return cached[1]
+
+
+def pack_articles(articles, token_budget):
+    # 依序塞法條，超過 token 預算就停 (至少保留一條)
+    picked, used = [], 0
+    for article in articles:
+        body = f"【{article.law}】{article.text()}" if article.law else article.text()
+        cost = estimate_tokens(body)
+        if picked and used + cost > token_budget:
+            break
+        picked.append(body)
+        used += cost
+    return "\n\n".join(picked)
+
+
+def retrieve(law_database, subject, query, k=6, token_budget=1800):
+    # 依題目/擬答挑出最相關的 k 條法條
+    index = subject_index(law_database, subject)
+    if not len(index):
+        return law_database.get(subject, "查無資料")  # 沒有可解析的條文 (例如佔位文字) 就原樣回傳
+    hits = [article for _, article in index.search(query, k)]
+    if not hits:
+        hits = index.articles[:k]
+    return pack_articles(hits, token_budget)
+
+
+def related_articles(index, k=6, rng=random):
+    # 出題用：隨機挑一條當錨點，再用 BM25 找它的相關條文 (錨點排第一)
+    anchor = rng.choice(index.articles)
+    hits = [anchor] + [a for _, a in index.search(anchor.text(), k) if a is not anchor]
+    return hits[:k]
+
@@ -1,269 +1,161 @@
-# laws.py - 海巡特考全方位法規資料庫 (擴充版)
-
-# 1. 【海岸巡防法】(核心行政法)
-cga_law = """
-【海岸巡防法】
-第 1 條 (立法目的)：
-為維護海域及海岸秩序，與資源之保護利用，確保國家安全，保障人民權益，特制定本法。
-
-第 2 條 (主管機關)：
-本法之主管機關為海洋委員會。
-海洋委員會海巡署（以下簡稱海巡署）及所屬機關執行本法所定事項，並受主管機關之指揮、監督。
-
-第 3 條 (巡防機關)：
-本法所稱巡防機關，係指海巡署及所屬機關。
-
-第 4 條 (掌理事項)：
-巡防機關掌理下列事項：
-一、海岸管制區之管制及安全維護事項。
-二、入出港船舶或其他水上運輸工具之安全檢查事項。
-三、海域、海岸、河口與非通商口岸之查緝走私、防止非法入出國、執行通商口岸人員之安全檢查及其他犯罪調查事項。
-四、海域及海岸巡防涉外事務之協調、調查及處理事項。
-五、走私情報之蒐集，滲透及安全情報之調查處理事項。
-六、海洋環境保護及海洋資源保育事項。
-七、海上救難、海洋災害救護及海上糾紛處理事項。
-八、漁業巡護及漁業資源之維護事項。
-九、其他依法執行事項。
-前項第五款有關海域及海岸之安全情報調查處理事項，並受國家安全局之指導、協調及支援。
-
-第 5 條 (職權行使)：
-巡防機關人員執行職務時，得行使下列職權：
-一、對進出海域、海岸、河口、非通商口岸之人員、船舶、車輛或其他運輸工具，進行檢查。
-二、對航行海域內之船舶，有事實足認有違法之虞時，得命其停止航行、回航，其抗不遵照者，得進行緊追、登臨、檢查；必要時，得強制為之。但不得逾越必要之程度。
-
-第 6 條 (武器器械使用)：
-巡防機關人員執行職務時，得使用武器或其他必要之器械；其使用辦法，由行政院定之。
-"""
-
-# 2. 【海岸巡防機關器械使用條例】(執法關鍵)
-weapon_law = """
-【海岸巡防機關器械使用條例】
-第 6 條 (使用刀或槍之情形)：
-巡防機關人員執行職務時，遇有下列各款情形之一者，得使用刀或槍：
-一、巡防機關人員之生命、身體、自由、裝備遭受強暴或脅迫，或有事實足認有受危害之虞時。
-二、人民之生命、身體、自由、財產遭受強暴或脅迫，或有事實足認有受危害之虞時。
-三、所防衛之土地、場所、建築物、工作物、車、船、航空器遭受危害時。
-四、持有兇器、危險物品或交通工具有事實足認已供或將供犯罪之用，經告誡拋棄或交付，或命其停止而不聽從時。
-五、基於事實需要，依本條例或其他法令規定，使用警棍、手銬無法達成目的時。
-
-第 9 條 (使用砲之情形)：
-巡防機關人員執行職務，遇有下列各款情形之一，經使用刀或槍等器械仍不能制止，並經巡防機關最高首長就該情形合理判斷，認已無其他手段制止時，得於必要限度內使用砲：
-一、遭受武力危害或脅迫時。
-二、航行海域內之船舶或航空器，有事實足認有違法之虞，經命其停止航行、回航，其抗不遵照，並以武力危害或脅迫巡防機關人員或艦艇時。
-"""
-
-# 3. 【中華民國刑法】(實體法)
-criminal_code = """
-【中華民國刑法】
-第 10 條 (公務員定義)：
-稱公務員者，謂下列人員：
-一、依法令服務於國家、地方自治團體所屬機關而具有法定職務權限，以及其他依法令從事於公共事務，而具有法定職務權限者。
-
-第 21 條 (依法令之行為)：
-依法令之行為，不罰。但明知為違法而執行之者，不在此限。
-
-第 24 條 (緊急避難)：
-因避免自己或他人生命、身體、自由、財產之緊急危難而出於不得已之行為，不罰。
-
-第 134 條 (準受賄罪/不純正瀆職)：
-公務員假借職務上之權力、機會或方法，以故意犯本章以外各罪者，加重其刑至二分之一。
-"""
-
-# 4. 【刑事訴訟法】(程序法)
-criminal_proc = """
-【刑事訴訟法】
-第71條之1（到場詢問通知書）:
-﹝1﹞司法警察官或司法警察，因調查犯罪嫌疑人犯罪情形及蒐集證據之必要，得使用通知書，通知犯罪嫌疑人到場詢問。經合法通知，無正當理由不到場者，得報請檢察官核發拘票。
-﹝2﹞前項通知書，由司法警察機關主管長官簽名，其應記載事項，準用前條第二項第一款至第三款之規定。
-
-第76條（不經傳喚逕行拘提事由）:
-﹝1﹞被告犯罪嫌疑重大，而有下列情形之一者，必要時，得不經傳喚逕行拘提：
-一、無一定之住、居所者。
-二、逃亡或有事實足認為有逃亡之虞者。
-三、有事實足認為有湮滅、偽造、變造證據或勾串共犯或證人之虞者。
-四、所犯為死刑、無期徒刑或最輕本刑為五年以上有期徒刑之罪者。
-
-第88條（現行犯與準現行犯）:	
-﹝1﹞現行犯，不問何人得逕行逮捕之。
-﹝2﹞犯罪在實施中或實施後即時發覺者，為現行犯。
-﹝3﹞有左列情形之一者，以現行犯論：
-一、被追呼為犯罪人者。
-二、因持有兇器、贓物或其他物件、或於身體、衣服等處露有犯罪痕跡，顯可疑為犯罪人者。
-
-第88條之1（偵查犯罪逕行拘提事由）:	
-﹝1﹞檢察官、司法警察官或司法警察偵查犯罪，有下列情形之一而情況急迫者，得逕行拘提之：
-一、因現行犯之供述，且有事實足認為共犯嫌疑重大者。
-二、在執行或在押中之脫逃者。
-三、有事實足認為犯罪嫌疑重大，經被盤查而逃逸者。但所犯顯係最重本刑為一年以下有期徒刑、拘役或專科罰金之罪者，不在此限。
-四、所犯為死刑、無期徒刑或最輕本刑為五年以上有期徒刑之罪，嫌疑重大，有事實足認為有逃亡之虞者。
-﹝2﹞前項拘提，由檢察官親自執行時，得不用拘票；由司法警察官或司法警察執行時，以其急迫情況不及報告檢察官者為限，於執行後，應即報請檢察官簽發拘票。如檢察官不簽發拘票時，應即將被拘提人釋放。
-﹝3﹞檢察官、司法警察官或司法警察，依第一項規定程序拘提犯罪嫌疑人，應即告知本人及其家屬，得選任辯護人到場。
-
-第89條之1（戒具之使用）＊立法理由:
-﹝1﹞執行拘提、逮捕或解送，得使用戒具。但不得逾必要之程度。
-﹝2﹞前項情形，應注意被告或犯罪嫌疑人之身體及名譽，避免公然暴露其戒具；認已無繼續使用之必要時，應即解除。﹝3﹞前二項使用戒具之範圍、方式、程序及其他應遵行事項之實施辦法，由行政院會同司法院定之。
-
-第91條（拘捕被告之解送）:	
-﹝1﹞拘提或因通緝逮捕之被告，應即解送指定之處所；如二十四小時內不能達到指定之處所者，應分別其命拘提或通緝者為法院或檢察官，先行解送較近之法院或檢察機關，訊問其人有無錯誤。
-
-第95條（訊問被告應先告知事項）:	
-﹝1﹞訊問被告應先告知下列事項：
-一、犯罪嫌疑及所犯所有罪名。罪名經告知後，認為應變更者，應再告知。
-二、得保持緘默，無須違背自己之意思而為陳述。
-三、得選任辯護人。如為低收入戶、中低收入戶、原住民或其他依法令得請求法律扶助者，得請求之。
-四、得請求調查有利之證據。
-﹝2﹞無辯護人之被告表示已選任辯護人時，應即停止訊問。但被告同意續行訊問者，不在此限。
-
-第100條之3（准許夜間詢問之情形）:	
-﹝1﹞司法警察官或司法警察詢問犯罪嫌疑人，不得於夜間行之。但有左列情形之一者，不在此限︰
-一、經受詢問人明示同意者。
-二、於夜間經拘提或逮捕到場而查驗其人有無錯誤者。
-三、經檢察官或法官許可者。
-四、有急迫之情形者。
-﹝2﹞犯罪嫌疑人請求立即詢問者，應即時為之。
-﹝3﹞稱夜間者，為日出前，日沒後。
-
-第122條（搜索之客體）:	
-﹝1﹞對於被告或犯罪嫌疑人之身體、物件、電磁紀錄及住宅或其他處所，必要時得搜索之。
-﹝2﹞對於第三人之身體、物件、電磁紀錄及住宅或其他處所，以有相當理由可信為被告或犯罪嫌疑人或應扣押之物或電磁紀錄存在時為限，得搜索之。
-
-第 130 條 (附帶搜索)：
-檢察官、檢察事務官、司法警察官或司法警察逮捕被告、犯罪嫌疑人或執行拘提、羈押時，雖無搜索票，得逕行搜索其身體、隨身攜帶之物件、所使用之交通工具及其立即可觸及之處所。
-
-第131條（逕行搜索）:	
-﹝1﹞有左列情形之一者，檢察官、檢察事務官、司法警察官或司法警察，雖無搜索票，得逕行搜索住宅或其他處所：
-一、因逮捕被告、犯罪嫌疑人或執行拘提、羈押，有事實足認被告或犯罪嫌疑人確實在內者。
-二、因追躡現行犯或逮捕脫逃人，有事實足認現行犯或脫逃人確實在內者。
-三、有明顯事實足信為有人在內犯罪而情形急迫者。
-﹝2﹞檢察官於偵查中確有相當理由認為情況急迫，非迅速搜索，二十四小時內證據有偽造、變造、湮滅或隱匿之虞者，得逕行搜索，或指揮檢察事務官、司法警察官或司法警察執行搜索，並層報檢察長。
-﹝3﹞前二項搜索，由檢察官為之者，應於實施後三日內陳報該管法院；由檢察事務官、司法警察官或司法警察為之者，應於執行後三日內報告該管檢察署檢察官及法院。法院認為不應准許者，應於五日內撤銷之。
-﹝4﹞第一項、第二項之搜索執行後未陳報該管法院或經法院撤銷者，審判時法院得宣告所扣得之物，不得作為證據。
-
-第131條之1（同意搜索):	
-﹝1﹞搜索，經受搜索人出於自願性同意者，得不使用搜索票。但執行人員應出示證件，並將其同意之意旨記載於筆錄。
-
-第132條（強制搜索）:	
-﹝1﹞抗拒搜索者，得用強制力搜索之。但不得逾必要之程度。
-
-第133條（扣押之客體）:	
-﹝1﹞可為證據或得沒收之物，得扣押之。
-﹝2﹞為保全追徵，必要時得酌量扣押犯罪嫌疑人、被告或第三人之財產。
-﹝3﹞對於應扣押物之所有人、持有人或保管人，得命其提出或交付。
-﹝4﹞扣押不動產、船舶、航空器，得以通知主管機關為扣押登記之方法為之。
-﹝5﹞扣押債權得以發扣押命令禁止向債務人收取或為其他處分，並禁止向被告或第三人清償之方法為之。
-﹝6﹞依本法所為之扣押，具有禁止處分之效力，不妨礙民事假扣押、假處分及終局執行之查封、扣押。
-
-第 133-1 條
-非附隨於搜索之扣押，除以得為證據之物而扣押或經受扣押標的權利人同意者外，應經法官裁定。
-前項之同意，執行人員應出示證件，並先告知受扣押標的權利人得拒絕扣押，無須違背自己之意思而為同意，並將其同意之意旨記載於筆錄。
-第一項裁定，應記載下列事項：
-一、案由。
-二、應受扣押裁定之人及扣押標的。但應受扣押裁定之人不明時，得不予記載。
-三、得執行之有效期間及逾期不得執行之意旨；法官並得於裁定中，對執行人員為適當之指示。
-核發第一項裁定之程序，不公開之。
-
-第 133-2 條
-偵查中檢察官認有聲請前條扣押裁定之必要時，應以書面記載前條第三項第一款、第二款之事項，並敘述理由，聲請該管法院裁定。
-司法警察官認有為扣押之必要時，得依前項規定報請檢察官許可後，向該管法院聲請核發扣押裁定。
-檢察官、檢察事務官、司法警察官或司法警察於偵查中有相當理由認為情況急迫，有立即扣押之必要時，得逕行扣押；檢察官亦得指揮檢察事務官、司法警察官或司法警察執行。
-前項之扣押，由檢察官為之者，應於實施後三日內陳報該管法院；由檢察事務官、司法警察官或司法警察為之者，應於執行後三日內報告該管檢察署檢察官及法院。法院認為不應准許者，應於五日內撤銷之。
-第一項及第二項之聲請經駁回者，不得聲明不服。
-
-第 134 條（扣押之限制（二）－應守密之公物、公文書）
-政府機關、公務員或曾為公務員之人所持有或保管之文書及其他物件，如為其職務上應守秘密者，非經該管監督機關或公務員允許，不得扣押。
-前項允許，除有妨害國家之利益者外，不得拒絕。
-
-第 135 條（扣押之限制（三）－郵電）
-郵政或電信機關，或執行郵電事務之人員所持有或保管之郵件、電報，有左列情形之一者，得扣押之：
-一、有相當理由可信其與本案有關係者。
-二、為被告所發或寄交被告者。但與辯護人往來之郵件、電報，以可認為犯罪證據或有湮滅、偽造、變造證據或勾串共犯或證人之虞，或被告已逃亡者為限。
-為前項扣押者，應即通知郵件、電報之發送人或收受人。但於訴訟程序有妨害者，不在此限。
-
-第 136 條
-扣押，除由法官或檢察官親自實施外，得命檢察事務官、司法警察官或司法警察執行。
-命檢察事務官、司法警察官或司法警察執行扣押者，應於交與之搜索票或扣押裁定內，記載其事由。
-
-第 137 條
-檢察官、檢察事務官、司法警察官或司法警察執行搜索或扣押時，發現本案應扣押之物為搜索票或扣押裁定所未記載者，亦得扣押之。
-第一百三十一條第三項之規定，於前項情形準用之。
-
-第 138 條（強制扣押）
-應扣押物之所有人、持有人或保管人無正當理由拒絕提出或交付或抗拒扣押者，得用強制力扣押之。
-
-第 139 條（扣押後之處置（一）－收據、封緘）
-扣押，應制作收據，詳記扣押物之名目，付與所有人、持有人或保管人。
-扣押物，應加封緘或其他標識，由扣押之機關或公務員蓋印。
-
-第 140 條（扣押後之處置（二）－看守、保管、毀棄）
-扣押物，因防其喪失或毀損，應為適當之處置。
-不便搬運或保管之扣押物，得命人看守，或命所有人或其他適當之人保管。
-易生危險之扣押物，得毀棄之。
-
-第 141 條
-得沒收或追徵之扣押物，有喪失毀損、減低價值之虞或不便保管、保管需費過鉅者，得變價之，保管其價金。
-前項變價，偵查中由檢察官為之，審理中法院得囑託地方法院民事執行處代為執行。
-
-第 142 條
-扣押物若無留存之必要者，不待案件終結，應以法院之裁定或檢察官命令發還之；其係贓物而無第三人主張權利者，應發還被害人。
-扣押物因所有人、持有人或保管人之請求，得命其負保管之責，暫行發還。
-扣押物之所有人、持有人或保管人，有正當理由者，於審判中得預納費用請求付與扣押物之影本。
-
-第 142-1 條
-得沒收或追徵之扣押物，法院或檢察官依所有人或權利人之聲請，認為適當者，得以裁定或命令定相當之擔保金，於繳納後，撤銷扣押。
-第一百十九條之一之規定，於擔保金之存管、計息、發還準用之。
-
-第 143 條
-被告、犯罪嫌疑人或第三人遺留在犯罪現場之物，或所有人、持有人或保管人任意提出或交付之物，經留存者，準用前五條之規定。
-
-第 144 條（搜索、扣押之必要處分）
-因搜索及扣押得開啟鎖扃、封緘或為其他必要之處分。
-執行扣押或搜索時，得封鎖現場，禁止在場人員離去，或禁止前條所定之被告、犯罪嫌疑人或第三人以外之人進入該處所。
-對於違反前項禁止命令者，得命其離開或交由適當之人看守至執行終了。
-
-第 145 條
-法官、檢察官、檢察事務官、司法警察官或司法警察執行搜索及扣押，除依法得不用搜索票或扣押裁定之情形外，應以搜索票或扣押裁定示第一百四十八條在場之人。
-
-第 146 條（搜索或扣押時間之限制）
-有人住居或看守之住宅或其他處所，不得於夜間入內搜索或扣押。但經住居人、看守人或可為其代表之人承諾或有急迫之情形者，不在此限。
-於夜間搜索或扣押者，應記明其事由於筆錄。
-日間已開始搜索或扣押者，得繼續至夜間。
-第一百條之三第三項之規定，於夜間搜索或扣押準用之。
-
-第 147 條（搜索、扣押之共同限制－例外）
-左列處所，夜間亦得入內搜索或扣押：
-一、假釋人住居或使用者。
-二、旅店、飲食店或其他於夜間公眾可以出入之處所，仍在公開時間內者。
-三、常用為賭博、妨害性自主或妨害風化之行為者。
-
-第 148 條（搜索、扣押時之在場人（一））
-在有人住居或看守之住宅或其他處所內行搜索或扣押者，應命住居人、看守人或可為其代表之人在場；如無此等人在場時，得命鄰居之人或就近自治團體之職員在場。
-
-第 149 條（搜索、扣押時之在場人（二））
-在政府機關、軍營、軍艦或軍事上秘密處所內行搜索或扣押者，應通知該管長官或可為其代表之人在場。
-
-第 150 條（搜索、扣押時之在場人（三））
-當事人及審判中之辯護人得於搜索或扣押時在場。但被告受拘禁，或認其在場於搜索或扣押有妨害者，不在此限。
-搜索或扣押時，如認有必要，得命被告在場。
-行搜索或扣押之日、時及處所，應通知前二項得在場之人。但有急迫情形時，不在此限。
-
-第 151 條（暫停搜索、扣押應為之處分）
-搜索或扣押暫時中止者，於必要時應將該處所閉鎖，並命人看守。
-
-第 152 條（另案扣押）
-實施搜索或扣押時，發見另案應扣押之物亦得扣押之，分別送交該管法院或檢察官。
-
-第 153 條（囑託搜索或扣押）
-搜索或扣押，得由審判長或檢察官囑託應行搜索、扣押地之法官或檢察官行之。
-受託法官或檢察官發現應在他地行搜索、扣押者，該法官或檢察官得轉囑託該地之法官或檢察官。
-
-第 158-4 條 (證據排除-權衡法則)：
-除法律另有規定外，實施刑事訴訟程序之公務員因違背法定程序取得之證據，其有無證據能力之認定，應審酌人權保障及公共利益之均衡維護。
-"""
-
-# 5. 【總目錄】(更新版)
-law_database = {
-    "海巡法規": cga_law + "\n" + weapon_law, # 把海巡法和器械使用條例合在一起
-    "刑法": criminal_code,
-    "刑事訴訟法": criminal_proc,
-    "行政法": "目前專注於海巡核心法規，請選擇其他科目。"
-}
\ No newline at end of file
+# laws.py - 海巡特考法規資料庫：條文放在 law_data/ (一部法規一個檔，manifest.json 列出版本與各科用哪些法規)
+# 第一次用到某一科才載入 (mmap 逐行解析成逐條紀錄，不留整份原文)，檔案改了 (mtime / 內容雜湊) 會自動重新載入，不用重開 Streamlit
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from collections.abc import Mapping
+
+from law_index import LawIndex, parse_lines
+
+LAW_DATA_DIR = os.environ.get("LAW_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "law_data"))
+MANIFEST = "manifest.json"
+CHECK_INTERVAL = 2.0  # 同一個檔案幾秒內不重複 stat
+
+logger = logging.getLogger(__name__)
+
+
+def _signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _mapped(f):
+    # 空檔不能 mmap
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        mm = _mapped(f)
+        if mm is None:
+            return hashlib.sha256(b"").hexdigest()
+        with mm:
+            return hashlib.sha256(mm).hexdigest()
+
+
+def load_articles(path, law=""):
+    with open(path, "rb") as f:
+        mm = _mapped(f)
+        if mm is None:
+            return []
+        with mm:
+            return parse_lines((line.decode("utf-8") for line in iter(mm.readline, b"")), law)
+
+
+class _LawFile:
+    __slots__ = ("path", "signature", "sha256", "articles", "checked_at")
+
+    def __init__(self, path, signature, sha256, articles):
+        self.path = path
+        self.signature = signature
+        self.sha256 = sha256
+        self.articles = articles
+        self.checked_at = time.monotonic()
+
+
+class LawCorpus(Mapping):
+    # 介面跟原本的 law_database dict 一樣 (科目 -> 法規全文)；檢索請用 index(subject)，不用組全文
+    def __init__(self, root=LAW_DATA_DIR, check_interval=CHECK_INTERVAL):
+        self.root = root
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._manifest = None
+        self._manifest_signature = None
+        self._manifest_checked_at = 0.0
+        self._files = {}  # 法規名稱 -> _LawFile
+        self._indexes = {}  # 科目 -> (digest, LawIndex)
+
+    def _manifest_data(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._manifest is not None and now - self._manifest_checked_at < self.check_interval:
+                return self._manifest
+            self._manifest_checked_at = now
+            path = os.path.join(self.root, MANIFEST)
+            signature = _signature(path)
+            if signature != self._manifest_signature:
+                with open(path, encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+                self._manifest_signature = signature
+            return self._manifest
+
+    def _law(self, name):
+        # 回傳該法規目前的逐條紀錄；mtime 變了再比內容雜湊，真的不同才重新解析
+        with self._lock:
+            path = os.path.join(self.root, self._manifest_data()["laws"][name])
+            entry = self._files.get(name)
+            now = time.monotonic()
+            if entry is not None and entry.path == path and now - entry.checked_at < self.check_interval:
+                return entry
+            try:
+                signature = _signature(path)
+                if entry is not None and entry.path == path and entry.signature == signature:
+                    entry.checked_at = now
+                    return entry
+                sha256 = file_hash(path)
+                if entry is not None and entry.path == path and entry.sha256 == sha256:
+                    entry.signature, entry.checked_at = signature, now
+                    return entry
+                entry = self._files[name] = _LawFile(path, signature, sha256, load_articles(path, name))
+                logger.info("載入法規 %s (%d 條)", name, len(entry.articles))
+                return entry
+            except OSError:
+                if entry is None:
+                    raise
+                # 編輯器存檔到一半 (暫時不存在)：先用舊的
+                logger.warning("法規檔讀取失敗，沿用上一版：%s", path, exc_info=True)
+                return entry
+
+    def _subject(self, subject):
+        return self._manifest_data()["subjects"][subject]
+
+    @property
+    def version(self):
+        return self._manifest_data().get("version", "")
+
+    @property
+    def complete_laws(self):
+        # manifest 的 "complete" 列出收錄全文的法規；其他都是節錄，查不到的條號不能當成誤引
+        return frozenset(self._manifest_data().get("complete", ()))
+
+    def __iter__(self):
+        return iter(self._manifest_data()["subjects"])
+
+    def __len__(self):
+        return len(self._manifest_data()["subjects"])
+
+    def __getitem__(self, subject):
+        # 需要全文的舊呼叫端才組 (每次從檔案讀，不快取)
+        spec = self._subject(subject)
+        if not spec["laws"]:
+            return spec.get("placeholder", "")
+        texts = []
+        for name in spec["laws"]:
+            with open(self._law(name).path, encoding="utf-8") as f:
+                texts.append(f.read())
+        return "\n".join(texts)
+
+    def articles(self, subject):
+        return [article for name in self._subject(subject)["laws"] for article in self._law(name).articles]
+
+    def digest(self, subject):
+        # 這一科目前內容的雜湊 (題庫用來判斷舊題目要不要作廢)
+        spec = self._subject(subject)
+        parts = [self._law(name).sha256 for name in spec["laws"]] or [spec.get("placeholder", "")]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def index(self, subject):
+        with self._lock:
+            digest = self.digest(subject)
+            cached = self._indexes.get(subject)
+            if cached is None or cached[0] != digest:
+                cached = self._indexes[subject] = (digest, LawIndex(self.articles(subject)))
+            return cached[1]
+
+
+# 總目錄：整個 process 共用；import 時不讀任何檔案
+law_database = LawCorpus()
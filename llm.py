@@ -0,0 +1,94 @@
+# llm.py - Groq 對話呼叫：串流輸出 + 首字時間/總時間計時 + token 用量
+import time
+from dataclasses import dataclass
+
+from instrument import cost_usd, emit
+
+MODEL = "llama-3.3-70b-versatile"
+
+
+@dataclass
+class CallStats:
+    ttft: float = None  # 首字時間 (秒)
+    total: float = None  # 整個回應花的時間 (秒)
+    chunks: int = 0
+    text: str = ""
+    cached: bool = False  # 直接從快取拿，沒打 API
+    model: str = MODEL
+    prompt_tokens: int = None
+    completion_tokens: int = None
+    queue_time: float = None  # Groq 回報的排隊時間 (秒)
+    generation_time: float = None  # Groq 回報的生成時間 (秒)
+
+    @property
+    def cost_usd(self):
+        return cost_usd(self.model, self.prompt_tokens, self.completion_tokens)
+
+
+def _read_usage(stats, obj):
+    # 非串流在 response.usage；串流在最後一個 chunk 的 x_groq.usage
+    if isinstance(getattr(obj, "model", None), str):
+        stats.model = obj.model  # 可能被換成備援模型
+    usage = getattr(obj, "usage", None) or getattr(getattr(obj, "x_groq", None), "usage", None)
+    if usage is None:
+        return
+    stats.prompt_tokens = getattr(usage, "prompt_tokens", None)
+    stats.completion_tokens = getattr(usage, "completion_tokens", None)
+    stats.queue_time = getattr(usage, "queue_time", None)
+    stats.generation_time = getattr(usage, "completion_time", None)
+
+
+def _emit(stats, kind, stream, error=None):
+    emit(
+        "llm_call", stats.total or 0.0, kind=kind, model=stats.model, stream=stream,
+        ttft_ms=None if stats.ttft is None else round(stats.ttft * 1000, 3),
+        prompt_tokens=stats.prompt_tokens, completion_tokens=stats.completion_tokens,
+        queue_time=stats.queue_time, generation_time=stats.generation_time,
+        cost_usd=stats.cost_usd, error=error,
+    )
+
+
+def stream_chat(client, messages, model=MODEL, stats=None, kind="chat", **params):
+    # 產生器：一段一段吐出文字，給 st.write_stream 用；結束時把完整內容填進 stats
+    stats = stats if stats is not None else CallStats()
+    stats.model = model
+    start = time.perf_counter()
+    parts = []
+    try:
+        response = client.chat.completions.create(messages=messages, model=model, stream=True, **params)
+        for chunk in response:
+            _read_usage(stats, chunk)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if stats.ttft is None:
+                stats.ttft = time.perf_counter() - start
+            stats.chunks += 1
+            parts.append(delta)
+            yield delta
+    except Exception as e:
+        stats.total = time.perf_counter() - start
+        _emit(stats, kind, True, f"{type(e).__name__}: {e}"[:300])
+        raise
+    stats.total = time.perf_counter() - start
+    stats.text = "".join(parts)
+    _emit(stats, kind, True)
+
+
+def complete_chat(client, messages, model=MODEL, stats=None, kind="chat", **params):
+    # 不串流：等整段回來 (首字時間就等於總時間)
+    stats = stats if stats is not None else CallStats()
+    stats.model = model
+    start = time.perf_counter()
+    try:
+        response = client.chat.completions.create(messages=messages, model=model, **params)
+    except Exception as e:
+        stats.total = time.perf_counter() - start
+        _emit(stats, kind, False, f"{type(e).__name__}: {e}"[:300])
+        raise
+    stats.total = stats.ttft = time.perf_counter() - start
+    stats.chunks = 1
+    stats.text = response.choices[0].message.content
+    _read_usage(stats, response)
+    _emit(stats, kind, False)
+    return stats.text
@@ -0,0 +1,152 @@
+# llm_cache.py - Groq 回應快取：記憶體 LRU + 磁碟 SQLite，兩層都有 TTL；同樣的請求同時進來只打一次
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH", os.path.join("data", "llm_cache.db"))
+MEMORY_ENTRIES = 256
+DISK_ENTRIES = 5000
+
+
+def cache_key(model, messages, **params):
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LLMCache:
+    def __init__(self, path=CACHE_PATH, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.stats = Counter()  # memory_hits / disk_hits / misses (真的打 API) / evictions / coalesced (等別人的結果)
+        self._memory = OrderedDict()  # key -> (expires_at, text)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._connect() as db:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _remember(self, key, expires_at, text):
+        # 呼叫端要持有 self._lock
+        self._memory[key] = (expires_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, key):
+        text = self._lookup(key)
+        if text is None:
+            with self._lock:
+                self.stats["misses"] += 1
+        return text
+
+    def _lookup(self, key):
+        # 兩層都查；不算 misses (get_or_compute 只有真的去打 API 的人才算未命中)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+                self.stats["evictions"] += 1
+        if self.path:
+            with self._connect() as db:
+                row = db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row and row[1] > now:
+                    db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    with self._lock:
+                        self._remember(key, row[1], row[0])
+                        self.stats["disk_hits"] += 1
+                    return row[0]
+                if row:
+                    db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    with self._lock:
+                        self.stats["evictions"] += 1
+        return None
+
+    def put(self, key, text, ttl):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now + ttl, text)
+        if not self.path:
+            return
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", (key, text, now + ttl, now))
+            overflow = db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.disk_entries
+            if overflow > 0:
+                db.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)", (overflow,))
+                with self._lock:
+                    self.stats["evictions"] += overflow
+
+    def get_or_compute(self, key, compute, ttl, cacheable=None):
+        # 回傳 (文字, 是否命中快取)；同一把 key 同時只有一個人真的去打 API
+        # cacheable(text) 回傳 False 的結果 (例如備援模型的回答) 只給這次等待的人，不寫進快取
+        text = self._lookup(key)
+        if text is not None:
+            return text, True
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            if flight.result is None:
+                # 帶頭的人中途被打斷 (Streamlit rerun / stop 是 BaseException)，沒有結果，自己重算
+                return self.get_or_compute(key, compute, ttl, cacheable)
+            return flight.result, True
+        try:
+            result = compute()
+            if cacheable is None or cacheable(result):
+                self.put(key, result, ttl)
+            flight.result = result
+            return result, False
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+
+# 整個 process 共用
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache(path=CACHE_PATH):
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(path)
+        return _cache
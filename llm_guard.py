@@ -0,0 +1,209 @@
+# llm_guard.py - 包住 Groq client：每分鐘請求數 + token 數限流、429/逾時重試、太慢就換小模型
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from types import SimpleNamespace
+
+from instrument import emit
+from law_index import estimate_tokens
+
+# 每個模型的 (每分鐘請求數, 每分鐘 tokens)；依自己帳號的 Groq 額度調整
+MODEL_LIMITS = {
+    "llama-3.3-70b-versatile": (int(os.environ.get("GROQ_RPM", 30)), int(os.environ.get("GROQ_TPM", 12000))),
+    "llama-3.1-8b-instant": (30, 6000),
+}
+DEFAULT_LIMITS = (30, 6000)
+# 主模型超過期限 (秒) 還沒回應 (串流看第一個 chunk)，就依序改用後面的模型
+FALLBACK_MODELS = [m for m in os.environ.get("GROQ_FALLBACK_MODELS", "llama-3.1-8b-instant").split(",") if m]
+LATENCY_DEADLINE = float(os.environ.get("GROQ_DEADLINE", 20))
+MAX_RETRIES = 3
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+COMPLETION_ESTIMATE = 800  # 沒給 max_tokens 時，先預留這麼多輸出 tokens
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    # 容量 = 每分鐘額度，以固定速率回補
+    def __init__(self, per_minute, clock=time.monotonic, sleep=time.sleep):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount):
+        with self._lock:
+            self._refill()
+            return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def take(self, amount):
+        # 不夠就等；一次要超過容量的請求視為要整桶
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute, tokens_per_minute, clock=time.monotonic, sleep=time.sleep):
+        self.requests = TokenBucket(requests_per_minute, clock, sleep)
+        self.tokens = TokenBucket(tokens_per_minute, clock, sleep)
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        # 兩個桶一起拿，避免拿到請求額度卻卡在 token 額度
+        with self._lock:
+            self.requests.take(1)
+            self.tokens.take(tokens)
+
+    def wait_time(self, tokens):
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def estimate_request_tokens(messages, params):
+    prompt = sum(estimate_tokens(m.get("content") or "") for m in messages)
+    return prompt + (params.get("max_tokens") or COMPLETION_ESTIMATE)
+
+
+def status_code(error):
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_timeout(error):
+    return isinstance(error, TimeoutError) or "Timeout" in type(error).__name__
+
+
+def retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt, base=BASE_DELAY, cap=MAX_DELAY, rng=random):
+    # full jitter
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# 限流器整個 process 共用 (所有 session、背景補題、批次閱卷一起算)
+_shared_limiters = {}
+
+
+class GuardedGroq:
+    # 介面跟 Groq client 一樣 (client.chat.completions.create)，llm.py 不用改
+    def __init__(self, client, limiters=None, fallback_models=FALLBACK_MODELS, deadline=LATENCY_DEADLINE,
+                 max_retries=MAX_RETRIES, base_delay=BASE_DELAY, sleep=time.sleep, rng=random):
+        self.client = client
+        self.limiters = limiters if limiters is not None else _shared_limiters
+        self.fallback_models = list(fallback_models)
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.sleep = sleep
+        self.rng = rng
+        self._lock = threading.Lock()
+        self._pool = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def limiter(self, model):
+        with self._lock:
+            if model not in self.limiters:
+                self.limiters[model] = RateLimiter(*MODEL_LIMITS.get(model, DEFAULT_LIMITS))
+            return self.limiters[model]
+
+    def create(self, messages, model, **params):
+        chain = [model] + [m for m in self.fallback_models if m != model]
+        tokens = estimate_request_tokens(messages, params)
+        for i, current in enumerate(chain):
+            try:
+                return self._call_with_retries(messages, current, tokens, params, last=i == len(chain) - 1)
+            except Exception as e:
+                # 逾時或一直被限流：換下一個模型
+                if i == len(chain) - 1 or not (is_timeout(e) or status_code(e) == 429):
+                    raise
+                emit("llm_fallback", 0.0, model=current, next_model=chain[i + 1], error=f"{type(e).__name__}: {e}"[:300])
+
+    def _call_with_retries(self, messages, model, tokens, params, last):
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire(tokens)
+            try:
+                return self._call_with_deadline(messages, model, params)
+            except Exception as e:
+                code = status_code(e)
+                # 逾時交給上層換模型 (最後一個模型才自己重試)
+                retryable = code in RETRYABLE_STATUS or (is_timeout(e) and last) or "Connection" in type(e).__name__
+                if not retryable or attempt == self.max_retries:
+                    raise
+                delay = retry_after(e) or backoff_delay(attempt, self.base_delay, rng=self.rng)
+                emit("llm_retry", delay, model=model, attempt=attempt + 1, http_status=code, error=f"{type(e).__name__}: {e}"[:300])
+                self.sleep(delay)
+
+    def _call_with_deadline(self, messages, model, params):
+        # SDK 的 timeout 在串流時只管每次 socket 讀取，所以期限自己算：
+        # 非串流等整個回應，串流等到第一個 chunk；超過就丟 DeadlineExceeded (晚到的串流直接關掉)
+        stream = params.get("stream", False)
+
+        def call():
+            response = self.client.chat.completions.create(messages=messages, model=model, **params)
+            if not stream:
+                return response
+            chunks = iter(response)
+            return response, chunks, next(chunks, None)
+
+        if not self.deadline:
+            result = call()
+        else:
+            future = self._executor().submit(call)
+            try:
+                result = future.result(timeout=self.deadline)
+            except FutureTimeout:
+                future.add_done_callback(_close_late_stream)
+                raise DeadlineExceeded(f"{model} 超過 {self.deadline:g}s 沒有回應") from None
+        if not stream:
+            return result
+        _, chunks, first = result
+        return _resume(first, chunks)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="groq-deadline")
+            return self._pool
+
+
+def _resume(first, chunks):
+    if first is None:
+        return
+    yield first
+    yield from chunks
+
+
+def _close_late_stream(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if isinstance(result, tuple) and hasattr(result[0], "close"):
+        result[0].close()
@@ -0,0 +1,73 @@
+# notion.py - Notion 練習紀錄寫入
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrument import bind, emit
+
+NOTION_PAGES_URL = "https://api.notion.com/v1/pages"
+NOTION_VERSION = "2022-06-28"
+# Notion API 平均每秒約 3 個請求，批次寫入同時最多送這麼多
+NOTION_CONCURRENCY = 3
+
+
+class NotionError(RuntimeError):
+    def __init__(self, status_code, text):
+        super().__init__(f"Notion 回應 {status_code}: {text[:200]}")
+        self.status_code = status_code
+
+
+def build_page(database_id, subject, question, answer, feedback, date=None):
+    return {
+        "parent": {"database_id": database_id},
+        "properties": {
+            "題目": {"title": [{"text": {"content": question[:2000]}}]},
+            "科目": {"select": {"name": subject}},
+            "日期": {"date": {"start": date or time.strftime("%Y-%m-%d")}},
+            "你的擬答": {"rich_text": [{"text": {"content": answer[:2000]}}]},
+            "AI 建議": {"rich_text": [{"text": {"content": feedback[:2000]}}]},
+        },
+    }
+
+
+def post_page(token, page, session=None, url=NOTION_PAGES_URL, timeout=30):
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+        "Notion-Version": NOTION_VERSION,
+    }
+    if session is None:
+        import requests
+
+        session = requests
+    start = time.perf_counter()
+    try:
+        response = session.post(url, headers=headers, json=page, timeout=timeout)
+    except Exception as e:
+        emit("notion_http", time.perf_counter() - start, error=f"{type(e).__name__}: {e}"[:300])
+        raise
+    emit("notion_http", time.perf_counter() - start, http_status=response.status_code)
+    if response.status_code != 200:
+        raise NotionError(response.status_code, response.text)
+    return response.status_code
+
+
+def notion_sink(token, database_id, get_session=None):
+    # 給 outbox 用：失敗直接丟例外，由 outbox 負責重試；get_session 回傳共用的 requests.Session
+    def send(record):
+        page = build_page(database_id, record["subject"], record["question"], record["answer"], record["feedback"], record["created_at"][:10])
+        return post_page(token, page, session=get_session() if get_session else None)
+
+    def batch(records):
+        # Notion 沒有批次建立頁面的 API：共用同一個 Session (連線池) 同時送幾筆，各筆成敗分開回報
+        def one(record):
+            try:
+                return send(record)
+            except Exception as e:
+                return e
+
+        jobs = [bind(one) for _ in records]  # 沿用呼叫端的 trace id
+        with ThreadPoolExecutor(max_workers=NOTION_CONCURRENCY, thread_name_prefix="notion") as pool:
+            return list(pool.map(lambda job, record: job(record), jobs, records))
+
+    send.batch = batch
+    return send
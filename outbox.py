@@ -0,0 +1,219 @@
+# outbox.py - 本機 SQLite outbox：練習紀錄先落地，再背景同步到 Sheets / Notion
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrument import bind, emit
+
+OUTBOX_PATH = os.environ.get("OUTBOX_PATH", os.path.join("data", "outbox.db"))
+MAX_ATTEMPTS = 5
+BASE_DELAY = 1.0  # 第 n 次重試等 BASE_DELAY * 2**(n-1) 秒 (加一點 jitter)
+MAX_DELAY = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    feedback TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    record_id INTEGER NOT NULL REFERENCES records(id),
+    sink TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL,
+    PRIMARY KEY (record_id, sink)
+);
+CREATE INDEX IF NOT EXISTS deliveries_status ON deliveries(status);
+"""
+
+RECORD_FIELDS = ("created_at", "subject", "question", "answer", "feedback")
+
+
+class Outbox:
+    def __init__(self, sinks, path=OUTBOX_PATH, max_workers=4, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY):
+        self.sinks = dict(sinks)  # 名稱 -> callable(record)，失敗就丟例外
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="outbox")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+        self.resume()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def enqueue(self, record):
+        return self.enqueue_many([record])[0]
+
+    def enqueue_many(self, records):
+        # 先寫進本機 (同一個 transaction)，commit 完才丟給背景；
+        # sink 有 send.batch 的 (例如 Sheets 一次 append_rows) 整批送一次，其他逐筆送
+        record_ids = []
+        with self._connect() as db:
+            for record in records:
+                cur = db.execute(
+                    "INSERT INTO records (created_at, subject, question, answer, feedback) VALUES (?, ?, ?, ?, ?)",
+                    [record[f] for f in RECORD_FIELDS],
+                )
+                record_ids.append(cur.lastrowid)
+            db.executemany(
+                "INSERT INTO deliveries (record_id, sink, updated_at) VALUES (?, ?, ?)",
+                [(record_id, sink, time.time()) for record_id in record_ids for sink in self.sinks],
+            )
+        for sink, send in self.sinks.items():
+            if len(record_ids) > 1 and hasattr(send, "batch"):
+                self._executor.submit(bind(self._deliver_batch), record_ids, sink)
+            else:
+                for record_id in record_ids:
+                    self._submit(record_id, sink)
+        return record_ids
+
+    def resume(self):
+        # 重啟後把還沒送出的補送
+        with self._connect() as db:
+            rows = db.execute("SELECT record_id, sink FROM deliveries WHERE status = 'pending'").fetchall()
+        for row in rows:
+            if row["sink"] in self.sinks:
+                self._submit(row["record_id"], row["sink"])
+
+    def retry_failed(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT record_id, sink FROM deliveries WHERE status = 'failed'").fetchall()
+            db.execute("UPDATE deliveries SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+        for row in rows:
+            if row["sink"] in self.sinks:
+                self._submit(row["record_id"], row["sink"])
+        return len(rows)
+
+    def _submit(self, record_id, sink):
+        self._executor.submit(bind(self._deliver), record_id, sink)
+
+    def _load(self, db, record_id):
+        row = db.execute("SELECT * FROM records WHERE id = ?", (record_id,)).fetchone()
+        record = {f: row[f] for f in RECORD_FIELDS}
+        record["id"] = record_id
+        return record
+
+    def _deliver(self, record_id, sink):
+        with self._connect() as db:
+            record = self._load(db, record_id)
+        start = time.perf_counter()
+        try:
+            result = self.sinks[sink](record)
+        except Exception as e:
+            self._finish(record_id, sink, time.perf_counter() - start, error=e)
+            return
+        self._finish(record_id, sink, time.perf_counter() - start, result=result)
+
+    def _deliver_batch(self, record_ids, sink):
+        # send.batch(records) 回傳每筆的結果；丟例外或回傳 Exception 的那幾筆照一般流程重試
+        with self._connect() as db:
+            records = [self._load(db, record_id) for record_id in record_ids]
+        start = time.perf_counter()
+        try:
+            results = self.sinks[sink].batch(records)
+        except Exception as e:
+            results = [e] * len(records)
+        elapsed = time.perf_counter() - start
+        for record_id, result in zip(record_ids, results):
+            if isinstance(result, Exception):
+                self._finish(record_id, sink, elapsed, error=result, batch=len(records))
+            else:
+                self._finish(record_id, sink, elapsed, result=result, batch=len(records))
+
+    def _finish(self, record_id, sink, elapsed, result=None, error=None, batch=None):
+        if error is not None:
+            status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+            with self._connect() as db:
+                db.execute(
+                    "UPDATE deliveries SET attempts = attempts + 1, last_error = ?, updated_at = ? WHERE record_id = ? AND sink = ?",
+                    (str(error)[:500], time.time(), record_id, sink),
+                )
+                attempts = db.execute(
+                    "SELECT attempts FROM deliveries WHERE record_id = ? AND sink = ?", (record_id, sink)
+                ).fetchone()[0]
+                outcome = "failed" if attempts >= self.max_attempts else "retry"
+                if outcome == "failed":
+                    db.execute("UPDATE deliveries SET status = 'failed' WHERE record_id = ? AND sink = ?", (record_id, sink))
+            emit("deliver", elapsed, sink=sink, record_id=record_id, attempt=attempts, batch=batch,
+                 outcome=outcome, http_status=status, error=f"{type(error).__name__}: {error}"[:300])
+            if outcome == "failed":
+                return
+            delay = min(MAX_DELAY, self.base_delay * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            timer = threading.Timer(delay, bind(self._submit), (record_id, sink))
+            timer.daemon = True
+            timer.start()
+            return
+        with self._connect() as db:
+            db.execute(
+                "UPDATE deliveries SET status = 'delivered', attempts = attempts + 1, last_error = NULL, updated_at = ? WHERE record_id = ? AND sink = ?",
+                (time.time(), record_id, sink),
+            )
+        emit("deliver", elapsed, sink=sink, record_id=record_id, batch=batch, outcome="delivered",
+             http_status=result if isinstance(result, int) else None)
+
+    def status(self):
+        # {sink: {"pending": n, "delivered": n, "failed": n}}
+        counts = {sink: {"pending": 0, "delivered": 0, "failed": 0} for sink in self.sinks}
+        with self._connect() as db:
+            for row in db.execute("SELECT sink, status, COUNT(*) AS n FROM deliveries GROUP BY sink, status"):
+                counts.setdefault(row["sink"], {"pending": 0, "delivered": 0, "failed": 0})[row["status"]] = row["n"]
+        return counts
+
+    def failures(self, limit=20):
+        with self._connect() as db:
+            rows = db.execute(
+                """SELECT d.record_id, d.sink, d.attempts, d.last_error, r.created_at, r.subject
+                   FROM deliveries d JOIN records r ON r.id = d.record_id
+                   WHERE d.status = 'failed' ORDER BY d.updated_at DESC LIMIT ?""",
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def record_status(self, record_id):
+        with self._connect() as db:
+            rows = db.execute("SELECT sink, status FROM deliveries WHERE record_id = ?", (record_id,)).fetchall()
+        return {row["sink"]: row["status"] for row in rows}
+
+    def wait_idle(self, timeout=30.0, poll=0.05):
+        # 等所有 pending 送完 (benchmark / 批次模式用)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not any(c["pending"] for c in self.status().values()):
+                return True
+            time.sleep(poll)
+        return False
+
+
+# 整個 process 共用一個 outbox
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox(sinks, path=OUTBOX_PATH):
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox(sinks, path=path)
+        return _outbox
+
+
+def set_outbox(outbox):
+    # benchmark / 假後端用：換掉 process 共用的 outbox
+    global _outbox
+    with _outbox_lock:
+        _outbox = outbox
@@ -0,0 +1,62 @@
+# 批次閱卷頁：上傳一整份擬答 (CSV / JSONL)，同時批改並整批存進 Sheets / Notion
+import hashlib
+import os
+
+import streamlit as st
+
+import instrument
+from batch_grade import BATCH_CONCURRENCY, BatchGrader, parse_rows
+from grading import grade
+from laws import law_database
+from llm_cache import get_llm_cache
+from outbox import get_outbox
+from resources import default_sinks, get_groq_client
+
+BATCH_DIR = os.environ.get("BATCH_DIR", os.path.join("data", "batch"))
+
+instrument.setup()
+try:
+    GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
+except Exception:
+    st.error("找不到 GROQ_API_KEY，請檢查 Secrets 設定！")
+    st.stop()
+
+st.title("📚 批次閱卷")
+st.caption("上傳 CSV 或 JSONL，欄位為 subject / question / answer (或 科目 / 題目 / 擬答)。同一份檔案中斷後重新上傳，會從上次的地方接著批改。")
+
+uploaded = st.file_uploader("擬答檔案", type=["csv", "jsonl"])
+concurrency = st.slider("同時批改份數", 1, 16, BATCH_CONCURRENCY)
+save = st.checkbox("同步存進 Google Sheets 與 Notion", value=True)
+
+if uploaded is not None:
+    data = uploaded.getvalue()
+    rows = parse_rows(data.decode("utf-8-sig"), "jsonl" if uploaded.name.lower().endswith(".jsonl") else "csv")
+    # 結果檔用檔案內容命名，重新上傳同一份就能續跑
+    out_path = os.path.join(BATCH_DIR, hashlib.sha256(data).hexdigest()[:16] + ".jsonl")
+    st.write(f"共 {len(rows)} 份擬答")
+
+    if rows and st.button("🚀 開始批次閱卷"):
+        client = get_groq_client(GROQ_API_KEY)
+        cache = get_llm_cache()
+        progress = st.progress(0.0)
+        log = st.empty()
+
+        def on_result(result, counts):
+            done = counts["ok"] + counts["error"] + counts["skipped"]
+            progress.progress(done / max(1, counts["total"]))
+            log.caption(f"{done}/{counts['total']}・完成 {counts['ok']}・失敗 {counts['error']}・略過 {counts['skipped']}")
+
+        grader = BatchGrader(
+            lambda subject, question, answer: grade(client, cache, law_database, subject, question, answer),
+            out_path, outbox=get_outbox(default_sinks(st.secrets)) if save else None,
+            concurrency=concurrency, on_result=on_result,
+        )
+        with st.spinner("Groq 正在批次閱卷..."):
+            counts = grader.run(rows)
+        progress.progress(1.0)
+        st.success(f"✅ 完成 {counts['ok']}・失敗 {counts['error']}・略過 {counts['skipped']} (其中重複 {counts['duplicates']})・耗時 {counts['elapsed']}s")
+
+    if os.path.exists(out_path):
+        with open(out_path, encoding="utf-8") as f:
+            results = f.read()
+        st.download_button("⬇️ 下載批改結果 (JSONL)", results, file_name=os.path.splitext(uploaded.name)[0] + ".graded.jsonl")
@@ -0,0 +1,194 @@
+# prompts.py - 組 Groq prompt：指示 / 法條 / 題目 / 擬答 / 引用檢查各有 token 預算，超過就照固定規則截短或摘要，
+# 固定的指示放 system、法條放 user 最前面 (可變的擬答放最後，供應商的 prefix cache 才吃得到)，並算出比舊版模板省了多少 token
+import os
+import random
+from dataclasses import dataclass, field
+
+from citations import check_citations
+from law_index import estimate_tokens, pack_articles, related_articles, subject_index
+
+# 每次只帶最相關的幾條法條進 prompt (可用環境變數調整)
+LAW_TOP_K = int(os.environ.get("LAW_TOP_K", 6))
+LAW_TOKEN_BUDGET = int(os.environ.get("LAW_TOKEN_BUDGET", 1800))  # 舊版模板的法條預算 (算省下多少 token 用)
+# 各段 token 上限 (本機粗估，見 law_index.estimate_tokens)
+SECTION_BUDGETS = {
+    "instructions": int(os.environ.get("PROMPT_BUDGET_INSTRUCTIONS", 200)),
+    "statutes": int(os.environ.get("PROMPT_BUDGET_STATUTES", 1000)),
+    "question": int(os.environ.get("PROMPT_BUDGET_QUESTION", 400)),
+    "answer": int(os.environ.get("PROMPT_BUDGET_ANSWER", 1500)),
+    "checks": int(os.environ.get("PROMPT_BUDGET_CHECKS", 300)),
+}
+# 擬答太長時保留開頭與結尾 (結論常在最後)，中間省略
+ANSWER_TAIL_RATIO = 0.3
+# 1 = 先在本機比對引用條文，prompt 帶檢查結論；0 = 只帶 BM25 挑出的法條
+CITATION_CHECK = os.environ.get("CITATION_CHECK", "1") != "0"
+# 1 = 應引用條文帶全文 (prompt 會變大，預設只帶摘錄)
+FULL_STATUTES = os.environ.get("PROMPT_FULL_STATUTES", "0") == "1"
+
+# system 訊息每次都一樣 (prefix cache 的開頭)，科目、題目等可變內容一律放 user
+QUESTION_INSTRUCTIONS = "你是一位嚴格的海巡特考老師。依所附法規資料，針對指定科目設計一道情境式申論題。只要題目，不要答案。"
+FEEDBACK_INSTRUCTIONS = "任務：海巡特考閱卷評分並給予精確的申論建議。"
+
+
+@dataclass
+class PromptBuild:
+    messages: list
+    sections: dict  # 段落 -> 實際 tokens
+    trimmed: dict = field(default_factory=dict)  # 被截短的段落 -> 原本 tokens
+    baseline_tokens: int = 0  # 改版前的模板 (單一 user 訊息) 同樣輸入的 tokens
+
+    @property
+    def tokens(self):
+        return sum(estimate_tokens(m["content"]) for m in self.messages)
+
+    @property
+    def saved(self):
+        return self.baseline_tokens - self.tokens
+
+    def report(self):
+        # 給 instrument.span 用的欄位
+        return {"prompt_estimate": self.tokens, "tokens_saved": self.saved, "trimmed": sorted(self.trimmed)}
+
+
+def fit_text(text, budget, tail_ratio=0.0):
+    # 超過預算就截短：保留開頭 (與結尾 tail_ratio 的比例)，中間換成省略標記；同樣輸入永遠得到同樣輸出
+    if estimate_tokens(text) <= budget:
+        return text
+
+    def cut(keep):
+        tail = int(keep * tail_ratio)
+        marker = f"…(中略 {len(text) - keep} 字)…" if tail else f"…(以下略 {len(text) - keep} 字)"
+        return text[: keep - tail] + marker + (text[len(text) - tail :] if tail else "")
+
+    lo, hi = 0, len(text)  # 找出放得下的最多字數
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(cut(mid)) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return cut(lo)
+
+
+def fit_lines(lines, budget):
+    # 依序放整行，放不下的行數註明略去 (前面的行優先；省略標記也算在預算內)
+    if sum(estimate_tokens(line) + 1 for line in lines) <= budget:
+        return "\n".join(lines)
+    picked, used = [], estimate_tokens(f"…(另 {len(lines)} 項略)")
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        picked.append(line)
+        used += cost
+    return "\n".join(picked + [f"…(另 {len(lines) - len(picked)} 項略)"])
+
+
+def _article_body(article):
+    return f"【{article.law}】{article.text()}" if article.law else article.text()
+
+
+def _article_head(article):
+    head = f"{article.label}（{article.heading}）" if article.heading else article.label
+    return f"- 【{article.law}】{head}" if article.law else f"- {head}"
+
+
+SUMMARY_HEADER = "其他相關條文 (僅列標題)："
+
+
+def fit_articles(articles, budget):
+    # 依排名放全文；放不下的改成一行條號與標題 (摘要)，連摘要都放不下就只註明略去幾條
+    blocks, used = [], 0
+    for article in articles:
+        body = _article_body(article)
+        if used + estimate_tokens(body) > budget:
+            break
+        blocks.append(body)
+        used += estimate_tokens(body)
+    if not blocks and articles:
+        # 第一條就超過預算：截短也要放
+        return fit_text(_article_body(articles[0]), budget)
+    rest = articles[len(blocks):]
+    if rest:
+        room = budget - used - estimate_tokens(SUMMARY_HEADER) - 2
+        summary = fit_lines([_article_head(a) for a in rest], room) if room > 0 else ""
+        if summary:
+            blocks.append(SUMMARY_HEADER + "\n" + summary)
+    return "\n\n".join(blocks)
+
+
+class _Builder:
+    def __init__(self, budgets):
+        self.budgets = {**SECTION_BUDGETS, **(budgets or {})}
+        self.sections, self.trimmed = {}, {}
+
+    def add(self, name, text, fitted=None):
+        # fitted：已依預算整理好的內容 (法條、檢查結果)；沒給就照預算截短原文
+        budget = self.budgets[name]
+        if fitted is None:
+            fitted = fit_text(text, budget, ANSWER_TAIL_RATIO if name == "answer" else 0.0)
+        if fitted != text:
+            self.trimmed[name] = estimate_tokens(text)
+        self.sections[name] = estimate_tokens(fitted)
+        return fitted
+
+    def build(self, instructions, user, baseline):
+        system = self.add("instructions", instructions)
+        messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+        return PromptBuild(messages, self.sections, self.trimmed, estimate_tokens(baseline))
+
+
+def _placeholder(law_database, subject):
+    return law_database.get(subject, "查無資料")
+
+
+def question_prompt(law_database, subject, rng=random, budgets=None):
+    b = _Builder(budgets)
+    index = subject_index(law_database, subject)
+    if len(index):
+        hits = related_articles(index, LAW_TOP_K, rng)
+        statutes = b.add("statutes", "\n\n".join(map(_article_body, hits)), fit_articles(hits, b.budgets["statutes"]))
+        legacy_law = pack_articles(hits, LAW_TOKEN_BUDGET)
+    else:
+        statutes = b.add("statutes", _placeholder(law_database, subject))
+        legacy_law = _placeholder(law_database, subject)
+    baseline = f"你是一位嚴格的海巡特考老師。參考法規資料：{legacy_law}\n任務：針對「{subject}」設計一道情境式申論題。只要題目，不要答案。"
+    return b.build(QUESTION_INSTRUCTIONS, f"參考法規資料：\n{statutes}\n科目：{subject}", baseline)
+
+
+def legacy_feedback_prompt(question, answer, report):
+    # 改用 prompt builder 之前的閱卷模板 (user-014 版，單一 user 訊息)；只拿來算省下多少 token
+    return f"題目：{question}\n考生回答：{answer}\n引用條文檢查 (本機比對法規資料庫)：\n{report.to_prompt()}\n任務：閱卷評分並給予精確的申論建議。"
+
+
+def feedback_prompt(law_database, subject, question, answer, budgets=None):
+    # 順序固定：法條 (只跟題目有關) → 題目 → 擬答 → 引用檢查 (跟擬答有關)；同一題批改多份擬答時前段都一樣
+    b = _Builder(budgets)
+    index = subject_index(law_database, subject)
+    parts = []
+    if not CITATION_CHECK:
+        # 不做本機檢查：照舊帶 BM25 挑出的法條 (這時舊模板就是法條全文版)
+        if len(index):
+            hits = [a for _, a in index.search(question + "\n" + answer, LAW_TOP_K)] or index.articles[:LAW_TOP_K]
+            legacy_law = pack_articles(hits, LAW_TOKEN_BUDGET)
+            parts.append("參考法條：\n" + b.add("statutes", legacy_law, fit_articles(hits, b.budgets["statutes"])))
+        else:
+            legacy_law = _placeholder(law_database, subject)
+        parts += [f"題目：{b.add('question', question)}", f"考生回答：{b.add('answer', answer)}"]
+        baseline = f"題目：{question}\n考生回答：{answer}\n參考法條：{legacy_law}\n任務：閱卷評分並給予精確的申論建議。"
+        return b.build(FEEDBACK_INSTRUCTIONS, "\n\n".join(parts), baseline)
+
+    report = check_citations(law_database, subject, question, answer)
+    if report.expected:
+        if FULL_STATUTES:
+            header = report.expected_prompt().splitlines()[0]
+            full = "\n\n".join(map(_article_body, report.expected))
+            statutes = b.add("statutes", full, fit_articles(report.expected, b.budgets["statutes"] - estimate_tokens(header)))
+            parts.append(f"{header}\n{statutes}")
+        else:
+            excerpts = report.expected_prompt()
+            parts.append(b.add("statutes", excerpts, fit_lines(excerpts.splitlines(), b.budgets["statutes"])))
+    parts += [f"題目：{b.add('question', question)}", f"考生回答：{b.add('answer', answer)}"]
+    checks = report.findings_prompt()
+    parts.append("引用條文檢查 (本機比對法規資料庫)：\n" + b.add("checks", checks, fit_lines(checks.splitlines(), b.budgets["checks"])))
+    return b.build(FEEDBACK_INSTRUCTIONS, "\n".join(parts), legacy_feedback_prompt(question, answer, report))
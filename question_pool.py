@@ -0,0 +1,139 @@
+# question_pool.py - 每科預先出好的題庫，背景自動補題 (按下按鈕直接拿，不用等 70B 生成)
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from law_index import subject_index
+
+POOL_PATH = os.environ.get("QUESTION_POOL_PATH", os.path.join("data", "question_pool.json"))
+# 每科至少維持幾題
+POOL_WATERMARK = int(os.environ.get("QUESTION_POOL_WATERMARK", 3))
+# 背景補題每分鐘最多呼叫幾次 Groq (不要跟使用者搶額度)
+POOL_REQUESTS_PER_MINUTE = float(os.environ.get("QUESTION_POOL_RPM", 6))
+RETRY_AFTER_ERROR = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+def law_hash(law_text):
+    return hashlib.sha256(law_text.encode("utf-8")).hexdigest()[:16]
+
+
+def subject_digest(law_database, subject):
+    # laws.LawCorpus 有現成的檔案雜湊，不用組全文再算
+    if hasattr(law_database, "digest"):
+        return law_database.digest(subject)
+    return law_hash(law_database.get(subject, ""))
+
+
+class QuestionPool:
+    def __init__(self, generate, law_database, path=POOL_PATH, watermark=POOL_WATERMARK, requests_per_minute=POOL_REQUESTS_PER_MINUTE):
+        self.generate = generate  # callable(subject) -> 題目文字
+        self.law_database = law_database
+        self.path = path
+        self.watermark = watermark
+        self.min_interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_call = 0.0
+        self._thread = None
+        self._pools = self._load()  # {科目: [{"question", "law_hash", "created_at"}, ...]}
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._pools, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _fresh(self, subject):
+        # 法規內容變了，舊題目就作廢
+        current = subject_digest(self.law_database, subject)
+        entries = self._pools.get(subject, [])
+        fresh = [e for e in entries if e["law_hash"] == current]
+        if len(fresh) != len(entries):
+            self._pools[subject] = fresh
+            self._save()
+        return fresh, current
+
+    def size(self, subject):
+        with self._lock:
+            return len(self._fresh(subject)[0])
+
+    def take(self, subject):
+        # 拿一題 (沒有就回傳 None)，順便叫醒背景補題
+        with self._lock:
+            fresh, _ = self._fresh(subject)
+            question = fresh.pop(0)["question"] if fresh else None
+            if question is not None:
+                self._save()
+        self._wake.set()
+        return question
+
+    def add(self, subject, question, digest=None):
+        with self._lock:
+            digest = digest or subject_digest(self.law_database, subject)
+            self._pools.setdefault(subject, []).append({"question": question, "law_hash": digest, "created_at": time.time()})
+            self._save()
+
+    def _throttle(self):
+        wait = self._last_call + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_call = time.monotonic()
+
+    def refill_once(self):
+        # 找一個低於水位的科目補一題；都滿了回傳 False
+        for subject in list(self.law_database):
+            if not len(subject_index(self.law_database, subject)):
+                continue  # 只有佔位文字、沒有條文的科目不出題
+            with self._lock:
+                fresh, digest = self._fresh(subject)
+                if len(fresh) >= self.watermark:
+                    continue
+            self._throttle()
+            self.add(subject, self.generate(subject), digest)
+            return True
+        return False
+
+    def _run(self):
+        while True:
+            try:
+                refilled = self.refill_once()
+            except Exception:
+                logger.exception("題庫補題失敗")
+                time.sleep(RETRY_AFTER_ERROR)
+                continue
+            if not refilled:
+                self._wake.wait(timeout=60)
+                self._wake.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="question-pool", daemon=True)
+            self._thread.start()
+        return self
+
+
+# 整個 process 共用一個題庫與補題執行緒
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_question_pool(generate, law_database, path=POOL_PATH):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = QuestionPool(generate, law_database, path=path).start()
+        return _pool
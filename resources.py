@@ -0,0 +1,34 @@
+# resources.py - 整個 process 共用的客戶端/連線 (st.cache_resource)，重量級套件第一次用到才 import
+import streamlit as st
+
+
+@st.cache_resource(show_spinner=False)
+def get_groq_client(api_key):
+    from groq import Groq
+
+    from llm_guard import GuardedGroq
+
+    # 限流 + 重試 + 逾時換小模型；Groq SDK 自己的重試關掉，統一由 GuardedGroq 處理
+    return GuardedGroq(Groq(api_key=api_key, max_retries=0))
+
+
+@st.cache_resource(show_spinner=False)
+def get_notion_session():
+    # keep-alive：連續存檔不用每次重新 TLS 握手
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
+    return session
+
+
+def default_sinks(secrets):
+    # 練習紀錄要同步的地方 (網頁與批次閱卷共用)
+    from notion import notion_sink
+    from sheets import sheet_sink
+
+    return {
+        "Google Sheets": sheet_sink(secrets.get("GOOGLE_SHEETS_KEY")),
+        "Notion": notion_sink(secrets.get("NOTION_TOKEN"), secrets.get("NOTION_DATABASE_ID"), get_notion_session),
+    }
@@ -0,0 +1,167 @@
+# sheets.py - Google Sheets 共用連線 + 批次寫入 (整個 process 共用一份)
+import json
+import threading
+import time
+
+from instrument import emit
+
+SHEET_NAME = "海巡特考練習紀錄"
+HEADER = ["時間", "科目", "題目", "你的擬答", "AI 建議"]
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+# Google access token 有效一小時，提早一點重新授權
+TOKEN_TTL = 55 * 60
+
+
+def load_key(secret_data):
+    return json.loads(secret_data, strict=False) if isinstance(secret_data, str) else dict(secret_data)
+
+
+def connect_gspread(key_dict):
+    # 真正連 Google 的地方；測試時換成 fakes.FakeGspread().connect
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(key_dict, SCOPE)
+    return gspread.authorize(creds), creds
+
+
+class SheetHandle:
+    # 快取工作表 handle，token 過期才重新授權；表頭只檢查一次
+    def __init__(self, key_dict, sheet_name=SHEET_NAME, connect=connect_gspread, header=HEADER):
+        self.key_dict = key_dict
+        self.sheet_name = sheet_name
+        self.connect = connect
+        self.header = header
+        self._lock = threading.Lock()
+        self._sheet = None
+        self._creds = None
+        self._spreadsheet_id = None
+        self._expires_at = 0.0
+        self._header_checked = False
+
+    def _expired(self):
+        if getattr(self._creds, "access_token_expired", False):
+            return True
+        return time.monotonic() >= self._expires_at
+
+    def _open(self):
+        client, self._creds = self.connect(self.key_dict)
+        # 第一次用名稱找 (要查 Drive)，之後直接用 id 開
+        if self._spreadsheet_id:
+            spreadsheet = client.open_by_key(self._spreadsheet_id)
+        else:
+            spreadsheet = client.open(self.sheet_name)
+            self._spreadsheet_id = spreadsheet.id
+        self._sheet = spreadsheet.sheet1
+        self._expires_at = time.monotonic() + TOKEN_TTL
+
+    def worksheet(self):
+        with self._lock:
+            if self._sheet is None or self._expired():
+                self._open()
+            if not self._header_checked:
+                # 只讀第一列判斷是不是空表，不再整張 get_all_values()
+                if not self._sheet.row_values(1):
+                    self._sheet.append_row(self.header)
+                self._header_checked = True
+            return self._sheet
+
+    def invalidate(self):
+        with self._lock:
+            self._sheet = None
+
+
+class _Ticket:
+    def __init__(self, rows):
+        self.rows = rows
+        self.done = threading.Event()
+        self.error = None
+
+
+class BatchWriter:
+    # 各 session 同時送出的列排隊，由搶到寫入鎖的人一次 append_rows 全部帶走
+    def __init__(self, handle):
+        self.handle = handle
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def append(self, row):
+        self.append_rows([row])
+
+    def append_rows(self, rows):
+        ticket = _Ticket([list(r) for r in rows])
+        with self._pending_lock:
+            self._pending.append(ticket)
+        with self._flush_lock:
+            if not ticket.done.is_set():
+                self._flush()
+        if ticket.error:
+            raise ticket.error
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        rows = [row for ticket in batch for row in ticket.rows]
+        start = time.perf_counter()
+        try:
+            self.handle.worksheet().append_rows(rows)
+            emit("sheets_append_rows", time.perf_counter() - start, rows=len(rows), http_status=200)
+        except Exception as e:
+            self.handle.invalidate()  # 連線可能壞了，下次重連
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            emit("sheets_append_rows", time.perf_counter() - start, rows=len(rows), http_status=status, error=f"{type(e).__name__}: {e}"[:300])
+            for ticket in batch:
+                ticket.error = e
+        for ticket in batch:
+            ticket.done.set()
+
+
+# 整個 process 共用 (Streamlit 各 session 都在同一個 process)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_sheet_writer(secret_data, connect=connect_gspread):
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BatchWriter(SheetHandle(load_key(secret_data), connect=connect))
+        return _writer
+
+
+def get_worksheet(secret_data, connect=connect_gspread):
+    # 讀取用 (練習紀錄同步)：跟寫入共用同一個授權與工作表 handle
+    return get_sheet_writer(secret_data, connect=connect).handle.worksheet()
+
+
+def set_sheet_writer(writer):
+    # benchmark / 假後端用：換掉 process 共用的 writer
+    global _writer
+    with _writer_lock:
+        _writer = writer
+
+
+def sheet_sink(secret_data, connect=connect_gspread):
+    # 給 outbox 用：失敗直接丟例外，由 outbox 負責重試
+    def send(record):
+        get_sheet_writer(secret_data, connect=connect).append(_row(record))
+        return 200
+
+    def batch(records):
+        # 批次閱卷：整批一次 append_rows
+        get_sheet_writer(secret_data, connect=connect).append_rows([_row(r) for r in records])
+        return [200] * len(records)
+
+    send.batch = batch
+    return send
+
+
+def _row(record):
+    return [record["created_at"], record["subject"], record["question"], record["answer"], record["feedback"]]
@@ -1,67 +1,127 @@
 import streamlit as st
-from groq import Groq # 換成 Groq 套件
 import os
 import time
-import json
-import requests
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import instrument
+from outbox import get_outbox
+from history import get_history_store
+from sheets import get_worksheet
+from resources import default_sinks, get_groq_client
+from llm import MODEL, CallStats, complete_chat, stream_chat
+from llm_cache import cache_key, get_llm_cache
+from question_pool import get_question_pool
 from laws import law_database
+from prompts import question_prompt
+from grading import FEEDBACK_CACHE_TTL, feedback_messages
 
-# --- 1. 設定 Groq API ---
+# 串流模式：邊生成邊顯示 (設成 0 改回整段等完再顯示)
+LLM_STREAMING = os.environ.get("LLM_STREAMING", "1") != "0"
+instrument.setup()  # 各階段耗時 / token / 成本寫進 data/metrics.jsonl
+# 回應快取秒數 (0 = 不快取)：出題要有變化不快取；同一題同一份擬答的批改可以直接重用
+LLM_CACHE_TTL = {
+    "question": 0,
+    "feedback": FEEDBACK_CACHE_TTL,
+}
+
+# --- 1. 設定 Groq API (client 整個 process 共用，第一次呼叫才建立) ---
 try:
-    client = Groq(api_key=st.secrets["GROQ_API_KEY"])
+    GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
 except:
     st.error("找不到 GROQ_API_KEY，請檢查 Secrets 設定！")
     st.stop()
 
-# --- 2. 設定 Google Sheets 連線 ---
-def save_to_google_sheet(data_row):
-    try:
-        secret_data = st.secrets["GOOGLE_SHEETS_KEY"]
-        key_dict = json.loads(secret_data, strict=False) if isinstance(secret_data, str) else secret_data
-        
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(key_dict, scope)
-        client_gs = gspread.authorize(creds)
-        
-        sheet = client_gs.open("海巡特考練習紀錄").sheet1
-        if len(sheet.get_all_values()) == 0:
-            sheet.append_row(["時間", "科目", "題目", "你的擬答", "AI 建議"])
-            
-        sheet.append_row(data_row)
-        return True
-    except Exception as e:
-        st.error(f"Google Sheet 存檔失敗: {e}")
-        return False
-
-# --- 3. 設定 Notion 連線 ---
-def save_to_notion(subject, question, answer, feedback):
-    try:
-        token = st.secrets["NOTION_TOKEN"]
-        database_id = st.secrets["NOTION_DATABASE_ID"]
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
-        data = {
-            "parent": {"database_id": database_id},
-            "properties": {
-                "題目": {"title": [{"text": {"content": question[:2000]}}]},
-                "科目": {"select": {"name": subject}},
-                "日期": {"date": {"start": time.strftime("%Y-%m-%d")}},
-                "你的擬答": {"rich_text": [{"text": {"content": answer[:2000]}}]},
-                "AI 建議": {"rich_text": [{"text": {"content": feedback[:2000]}}]}
-            }
-        }
-        response = requests.post("https://api.notion.com/v1/pages", headers=headers, json=data)
-        return response.status_code == 200
-    except Exception as e:
-        st.error(f"Notion 連線異常: {e}")
-        return False
-
-# --- 4. 網頁介面 ---
+def groq_client():
+    return get_groq_client(GROQ_API_KEY)
+
+# --- 2. 設定 Google Sheets / Notion 同步 ---
+# 紀錄先寫進本機 SQLite outbox，再由背景執行緒同時送到兩個平台 (失敗會自動重試)
+def get_persistence():
+    return get_outbox(default_sinks(st.secrets))
+
+# --- 3. 同步狀態 ---
+def show_sync_status(outbox):
+    st.subheader("存檔同步狀態")
+    status = outbox.status()
+    for sink, counts in status.items():
+        st.caption(f"{sink}：待送 {counts['pending']}・失敗 {counts['failed']}・完成 {counts['delivered']}")
+    if any(counts["failed"] for counts in status.values()):
+        for failure in outbox.failures(limit=5):
+            st.caption(f"⚠️ {failure['created_at']} {failure['subject']} → {failure['sink']}：{failure['last_error']}")
+        if st.button("🔁 重送失敗紀錄"):
+            outbox.retry_failed()
+
+# 弱點分析：查本機練習紀錄 (毫秒級)，試算表的新列在背景增量同步
+def show_dashboard(subject):
+    history = get_history_store()
+    secret = st.secrets.get("GOOGLE_SHEETS_KEY")
+    if secret:
+        history.sync_async(lambda: get_worksheet(secret))
+    st.caption(f"本機紀錄 {history.count()} 筆 (本科 {history.count(subject)} 筆)")
+    if history.last_error:
+        st.caption(f"⚠️ 同步失敗：{history.last_error}")
+    trend = history.score_trend(subject)
+    if trend:
+        st.line_chart(trend, x="日期", y="平均分數")
+    missed = history.most_missed(subject)
+    if missed:
+        st.caption("最常漏答的條文")
+        st.dataframe(missed, hide_index=True)
+
+# --- 4. Groq 呼叫 (串流時邊生成邊顯示，可快取的走快取) ---
+llm_cache = get_llm_cache()
+
+def ask_groq(messages, kind):
+    ttl = LLM_CACHE_TTL.get(kind, 0)
+    if not ttl:
+        return call_groq(messages, kind)
+    stats = CallStats()
+    # 限流時換成備援模型的回答只用這一次，不存成主模型的快取
+    text, hit = llm_cache.get_or_compute(
+        cache_key(MODEL, messages), lambda: call_groq(messages, kind, stats), ttl, cacheable=lambda _: stats.model == MODEL
+    )
+    if hit:
+        instrument.emit("llm_cache_hit", 0.0, kind=kind)
+        st.session_state.setdefault('timings', {})[kind] = CallStats(ttft=0.0, total=0.0, text=text, cached=True)
+    return text
+
+def call_groq(messages, kind, stats=None):
+    stats = stats if stats is not None else CallStats()
+    if LLM_STREAMING:
+        live = st.empty()
+        try:
+            with live.container():
+                st.write_stream(stream_chat(groq_client(), messages, stats=stats, kind=kind))
+        finally:
+            live.empty()  # 串流完交給下面固定的區塊顯示 (中途失敗也清掉半截內容)
+    else:
+        complete_chat(groq_client(), messages, stats=stats, kind=kind)
+    st.session_state.setdefault('timings', {})[kind] = stats
+    return stats.text
+
+def show_timing(kind):
+    stats = st.session_state.get('timings', {}).get(kind)
+    if stats and stats.cached:
+        st.caption("⚡ 快取命中，未重新呼叫 Groq")
+    elif stats and stats.total is not None:
+        usage = ""
+        if stats.prompt_tokens is not None:
+            usage = f"・tokens {stats.prompt_tokens}→{stats.completion_tokens}・約 ${stats.cost_usd:.5f}"
+        st.caption(f"⏱️ 首字 {stats.ttft or stats.total:.2f}s・總計 {stats.total:.2f}s{usage}")
+
+# --- 5. 題庫 (背景預先出題) ---
+def question_messages(subject):
+    # prompt 組法與各段 token 預算見 prompts.py
+    with instrument.span("prompt_build", kind="question") as s:
+        build = question_prompt(law_database, subject)
+        s.update(build.report())
+    return build.messages
+
+def generate_question(subject):
+    # 背景執行緒呼叫，不能碰 st.*
+    return complete_chat(groq_client(), question_messages(subject), kind="question_pool")
+
+question_pool = get_question_pool(generate_question, law_database)
+
+# --- 6. 網頁介面 ---
 st.title("🌊 海巡特考 AI 陪讀教練")
 st.subheader("Groq 極速引擎版 (Sheets + Notion)")
 
@@ -69,49 +129,72 @@ with st.sidebar:
     st.header("功能選單")
     subject = st.selectbox("選擇科目", ("海巡法規", "刑法", "刑事訴訟法", "行政法"))
     st.info("🚀 Groq 強力驅動：模型選用 Llama-3.3-70b")
+    st.caption(f"📦 題庫存量：{question_pool.size(subject)} 題")
+    force_fresh = st.checkbox("🆕 不用題庫，現場出新題")
+    show_sync_status(get_persistence())
+    cache_stats = llm_cache.stats
+    st.caption(f"⚡ 回應快取：命中 {cache_stats['memory_hits'] + cache_stats['disk_hits'] + cache_stats['coalesced']}・未命中 {cache_stats['misses']}・淘汰 {cache_stats['evictions']}")
+    if st.checkbox("📈 弱點分析"):
+        show_dashboard(subject)
+    if st.checkbox("📊 顯示效能面板"):
+        st.dataframe(instrument.rolling_stats.summary(), hide_index=True)
 
 # AI 出題邏輯
 if st.button("🔥 請 Groq 出一題申論題"):
-    selected_law = law_database.get(subject, "查無資料")
-    prompt = f"你是一位嚴格的海巡特考老師。參考法規資料：{selected_law}\n任務：針對「{subject}」設計一道情境式申論題。只要題目，不要答案。"
-    
-    with st.spinner('Groq 正在光速思考...'):
-        # 呼叫 Groq 模型 (Llama 3.3 是目前最強推薦)
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-        )
-        st.session_state['question'] = chat_completion.choices[0].message.content
-        st.session_state['current_feedback'] = None 
+    with instrument.trace():
+        with instrument.span("question_pool_take", subject=subject) as s:
+            pooled = None if force_fresh else question_pool.take(subject)
+            s["hit"] = bool(pooled)
+        if pooled:
+            # 題庫有現成的就直接用
+            st.session_state['question'] = pooled
+            st.session_state.get('timings', {}).pop('question', None)
+        else:
+            with st.spinner('Groq 正在光速思考...'):
+                messages = question_messages(subject)
+                # 呼叫 Groq 模型 (Llama 3.3 是目前最強推薦)
+                try:
+                    st.session_state['question'] = ask_groq(messages, "question")
+                except Exception as e:
+                    # 重試、換備援模型都失敗了
+                    st.error(f"Groq 暫時無法回應，請稍後再試：{e}")
+    st.session_state['current_feedback'] = None 
 
 # 作答與存檔區
 if 'question' in st.session_state:
     st.info(st.session_state['question'])
+    show_timing("question")
     with st.form(key='answer_form'):
         user_answer = st.text_area("請輸入擬答", height=200)
         submit_btn = st.form_submit_button("📝 提交並同步存檔")
 
     if submit_btn and user_answer:
-        selected_law = law_database.get(subject, "查無資料")
-        verify_prompt = f"題目：{st.session_state['question']}\n考生回答：{user_answer}\n參考法條：{selected_law}\n任務：閱卷評分並給予精確的申論建議。"
-        
-        with st.spinner('Groq 正在閱卷並存檔...'):
-            # 1. AI 批改
-            response = client.chat.completions.create(
-                messages=[{"role": "user", "content": verify_prompt}],
-                model="llama-3.3-70b-versatile",
-            )
-            feedback_text = response.choices[0].message.content
-            st.session_state['current_feedback'] = feedback_text
-            
-            # 2. 存檔到試算表與 Notion
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-            google_ok = save_to_google_sheet([timestamp, subject, st.session_state['question'], user_answer, feedback_text])
-            notion_ok = save_to_notion(subject, st.session_state['question'], user_answer, feedback_text)
-
-            if google_ok and notion_ok:
-                st.success("✅ 雙平台存檔成功！")
+        with instrument.trace():
+            verify_messages = feedback_messages(law_database, subject, st.session_state['question'], user_answer)
+
+            with st.spinner('Groq 正在閱卷...'):
+                # 1. AI 批改
+                try:
+                    feedback_text = ask_groq(verify_messages, "feedback")
+                except Exception as e:
+                    feedback_text = None
+                    st.error(f"Groq 暫時無法回應，請稍後再提交一次：{e}")
+                st.session_state['current_feedback'] = feedback_text
+
+            # 2. 存進本機 outbox，背景同步到試算表與 Notion (不用等網路)
+            if feedback_text:
+                with instrument.span("save_enqueue") as s:
+                    s["record_id"] = get_persistence().enqueue({
+                        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "subject": subject,
+                        "question": st.session_state['question'],
+                        "answer": user_answer,
+                        "feedback": feedback_text,
+                    })
+        if feedback_text:
+            st.success("✅ 已存入本機紀錄，背景同步 Google Sheets 與 Notion 中")
 
 if 'current_feedback' in st.session_state and st.session_state['current_feedback']:
     st.markdown("### 批改結果")
-    st.write(st.session_state['current_feedback'])
\ No newline at end of file
+    st.write(st.session_state['current_feedback'])
+    show_timing("feedback")
\ No newline at end of file
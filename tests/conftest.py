@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 測試不寫 data/metrics.jsonl
+os.environ.setdefault("METRICS_LOG", "")
+
+from laws import LawCorpus  # noqa: E402
+
+# 測試用的小型法規資料庫 (甲法、乙法標成全文收錄)：甲科兩部法規、乙科一部、丙科是條文很長的法規 (測 token 預算)、空科只有佔位文字
+CORPUS_LAWS = {
+    "甲法": "【甲法】\n第 1 條 (目的)：\n為保護海洋，特制定本法。\n第 131 條\n逕行搜索。\n",
+    "乙法": "【乙法】\n第 131 條之1\n搜索經受搜索人同意者，得不使用搜索票。\n",
+    "丙法": "【丙法】\n" + "".join(f"第 {n} 條 (第{n}條標題)\n{'海巡機關執行職務。' * 40}\n" for n in range(1, 9)),
+}
+CORPUS_SUBJECTS = {
+    "甲科": {"laws": ["甲法", "乙法"]},
+    "乙科": {"laws": ["乙法"]},
+    "丙科": {"laws": ["丙法"]},
+    "空科": {"laws": [], "placeholder": "尚未收錄"},
+}
+
+
+def write_corpus(root, laws=CORPUS_LAWS, subjects=CORPUS_SUBJECTS, version="1", complete=("甲法", "乙法")):
+    for name, text in laws.items():
+        (root / f"{name}.txt").write_text(text, encoding="utf-8")
+    manifest = {"version": version, "laws": {name: f"{name}.txt" for name in laws}, "subjects": subjects, "complete": list(complete)}
+    (root / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    write_corpus(tmp_path)
+    return LawCorpus(str(tmp_path), check_interval=0)
@@ -0,0 +1,82 @@
+import json
+import threading
+from types import SimpleNamespace
+
+from batch_grade import BatchGrader, parse_rows, row_key
+
+ROWS = [{"subject": "刑法", "question": f"題目{i}", "answer": f"擬答{i}"} for i in range(5)]
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.batches = []
+
+    def enqueue_many(self, records):
+        self.batches.append([r["key"] for r in records])
+        start = sum(map(len, self.batches[:-1]))
+        return list(range(start + 1, start + len(records) + 1))
+
+
+def grader_for(fail=()):
+    calls, lock = [], threading.Lock()
+
+    def grade_one(subject, question, answer):
+        with lock:
+            calls.append(question)
+        if question in fail:
+            raise RuntimeError("429")
+        return f"評語：{question}", SimpleNamespace(model="m", cached=False, prompt_tokens=10, completion_tokens=5)
+
+    return grade_one, calls
+
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_parse_rows_accepts_sheet_headers_and_drops_incomplete_rows():
+    rows = parse_rows("﻿科目,題目,你的擬答\n刑法,題目,擬答\n刑法,,擬答\n", "csv")
+    assert rows == [{"subject": "刑法", "question": "題目", "answer": "擬答"}]
+
+
+def test_rerun_resumes_from_checkpoint(tmp_path):
+    out = tmp_path / "graded.jsonl"
+    grade_one, calls = grader_for()
+    BatchGrader(grade_one, str(out), concurrency=2).run(ROWS[:3])
+    # 模擬上次寫到一半被中斷
+    with open(out, "a", encoding="utf-8") as f:
+        f.write('{"key": "')
+    counts = BatchGrader(grade_one, str(out), concurrency=2).run(ROWS)
+    assert (counts["ok"], counts["skipped"], counts["total"]) == (2, 3, 5)
+    assert sorted(calls) == ["題目0", "題目1", "題目2", "題目3", "題目4"]
+
+
+def test_duplicate_rows_are_graded_once_and_counted_as_skipped(tmp_path):
+    grade_one, calls = grader_for()
+    counts = BatchGrader(grade_one, str(tmp_path / "graded.jsonl")).run(ROWS[:2] + [dict(ROWS[0]), dict(ROWS[1])])
+    assert (counts["ok"], counts["skipped"], counts["duplicates"]) == (2, 2, 2)
+    assert sorted(calls) == ["題目0", "題目1"]
+
+
+def test_error_rows_are_retried_on_rerun(tmp_path):
+    out = tmp_path / "graded.jsonl"
+    grade_one, _ = grader_for(fail={"題目1"})
+    counts = BatchGrader(grade_one, str(out)).run(ROWS[:3])
+    assert (counts["ok"], counts["error"]) == (2, 1)
+    assert [r["error"] for r in read_results(out) if r["status"] == "error"] == ["RuntimeError: 429"]
+
+    grade_one, calls = grader_for()
+    counts = BatchGrader(grade_one, str(out)).run(ROWS[:3])
+    assert calls == ["題目1"] and (counts["ok"], counts["skipped"], counts["error"]) == (1, 2, 0)
+
+
+def test_saves_one_enqueue_many_per_batch(tmp_path):
+    out = tmp_path / "graded.jsonl"
+    box = FakeOutbox()
+    grade_one, _ = grader_for(fail={"題目2"})
+    BatchGrader(grade_one, str(out), outbox=box, concurrency=1, save_batch_size=2, save_interval=3600).run(ROWS)
+    # 失敗的那筆不送 outbox；最後不滿一批的也要存
+    assert [len(b) for b in box.batches] == [2, 2]
+    assert sorted(k for b in box.batches for k in b) == sorted(row_key(r) for r in ROWS if r["question"] != "題目2")
+    ok = [r for r in read_results(out) if r["status"] == "ok"]
+    assert sorted(r["record_id"] for r in ok) == [1, 2, 3, 4]
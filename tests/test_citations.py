@@ -0,0 +1,86 @@
+import grading
+from citations import CitationChecker, check_citations, parse_number
+from conftest import write_corpus
+from laws import LawCorpus, law_database
+
+
+def test_parse_number_handles_chinese_and_fullwidth():
+    assert parse_number("131") == 131
+    assert parse_number("１３１") == 131
+    assert parse_number("一百三十一") == 131
+    assert parse_number("十") == 10
+    assert parse_number("二十") == 20
+
+
+def test_extract_normalizes_sub_article_forms(corpus):
+    checker = CitationChecker(corpus, aliases={"甲": "甲法"})
+    found = checker.extract("依乙法第131條之1、乙法第 131-1 條及同法第一百三十一條之一，並參照甲第1條")
+    assert [(c.law, c.number) for c in found] == [("乙法", "131-1"), ("乙法", "131-1"), ("乙法", "131-1"), ("甲法", "1")]
+
+
+def test_check_flags_misquotes_and_coverage(corpus):
+    report = CitationChecker(corpus).check("甲科", "試述甲法第131條之要件", "依甲法第131條、乙法第131條、第999條、民法第184條")
+    assert [c.status for c in report.answer_citations] == ["ok", "wrong_law", "not_found", "unverifiable"]
+    assert report.coverage == 1.0
+    assert [c.raw for c in report.misquotes] == ["乙法第131條", "第999條"]
+    prompt = report.to_prompt()
+    assert "涵蓋率：1/1" in prompt and "查無此條" in prompt and "無法核對" in prompt
+
+
+def test_missing_article_and_cross_subject_lookup(corpus):
+    report = CitationChecker(corpus).check("乙科", "乙法第131條之1之同意搜索", "參照甲法第1條")
+    assert report.coverage == 0.0
+    assert [a.key for a in report.missing] == ["乙法第131-1條"]
+    # 別科的法規一樣查得到
+    assert report.answer_citations[0].status == "ok"
+
+
+def test_question_without_citations_falls_back_to_search(corpus):
+    report = CitationChecker(corpus).check("甲科", "何時可以逕行搜索？", "未寫條號")
+    assert not report.expected_from_question
+    assert report.expected[0].key == "甲法第131條"
+    assert "考生引用：無明確條號" in report.to_prompt()
+
+
+def test_placeholder_subject_reports_nothing(corpus):
+    report = CitationChecker(corpus).check("空科", "題目", "依甲法第1條")
+    assert report.expected == [] and report.coverage is None
+
+
+def test_rebuilds_after_law_file_changes(corpus, tmp_path):
+    checker = CitationChecker(corpus)
+    assert checker.check("甲科", "", "甲法第2條").answer_citations[0].status == "not_found"
+    (tmp_path / "甲法.txt").write_text("【甲法】\n第 2 條\n新增條文。\n", encoding="utf-8")
+    assert checker.check("甲科", "", "甲法第2條").answer_citations[0].status == "ok"
+
+
+def test_bundled_corpus_and_grading_prompt():
+    report = check_citations(law_database, "刑事訴訟法", "試述刑事訴訟法第 133-1 條", "依刑訴第133條之1，並參照刑法第10條")
+    assert report.coverage == 1.0 and not report.misquotes
+    prompt = grading.feedback_messages(law_database, "刑事訴訟法", "試述刑事訴訟法第 133-1 條", "依刑訴第133條之1")[-1]["content"]
+    assert "引用條文檢查" in prompt and "涵蓋率：1/1" in prompt
+
+
+def test_articles_missing_from_an_excerpt_are_unverifiable(tmp_path):
+    write_corpus(tmp_path, complete=("甲法",))
+    corpus = LawCorpus(str(tmp_path), check_interval=0)
+    report = CitationChecker(corpus).check("乙科", "", "乙法第228條、第228條、甲法第999條")
+    assert [c.status for c in report.answer_citations] == ["unverifiable", "unverifiable", "not_found"]
+    assert "- 乙法第228條 (資料庫未收錄該法規或該條，無法核對)" in report.to_prompt()
+    assert [c.raw for c in report.misquotes] == ["甲法第999條"]
+
+
+def test_bundled_corpus_is_an_excerpt():
+    report = check_citations(law_database, "刑事訴訟法", "", "依刑事訴訟法第228條")
+    assert report.answer_citations[0].status == "unverifiable" and not report.misquotes
+
+
+def test_unknown_law_names_stop_at_the_lead_in(corpus):
+    checker = CitationChecker(corpus)
+    found = checker.extract("甲違反憲法第8條，依照涉外民事法律適用法第1條，某甲於案發當日在港口民法第184條，依法第5條")
+    assert [(c.law, c.raw) for c in found] == [
+        ("憲法", "憲法第8條"),
+        ("涉外民事法律適用法", "涉外民事法律適用法第1條"),
+        ("民法", "民法第184條"),
+        ("", "第5條"),
+    ]
@@ -0,0 +1,78 @@
+import sqlite3
+
+from fakes import FakeGspread
+from history import HistoryStore, parse_score
+from sheets import HEADER
+
+
+def row(date, subject, question, answer, feedback):
+    return [f"{date} 10:00:00", subject, question, answer, feedback]
+
+
+def test_parse_score():
+    assert parse_score("評分：75 分。建議補充") == 75
+    assert parse_score("總分 88.5") == 88.5
+    assert parse_score("本題 80/100") == 80
+    assert parse_score("第131條 很重要") is None
+
+
+def test_sync_only_fetches_new_rows(tmp_path):
+    gspread = FakeGspread(rows=[HEADER, row("2026-01-01", "刑事訴訟法", "題目", "依第131條", "評分：60 分，建議補充第131條之1")])
+    store = HistoryStore(str(tmp_path / "history.db"))
+    assert store.sync(gspread.worksheet) == 1
+    gspread.worksheet.rows.append(row("2026-01-02", "刑事訴訟法", "題目", "第 131-1 條", "評分：80 分"))
+    assert store.sync(gspread.worksheet) == 1
+    assert store.sync(gspread.worksheet) == 0
+    assert gspread.worksheet.ranges == ["A1:E", "A3:E", "A4:E"]
+    assert gspread.worksheet.calls["get_all_values"] == 0
+    assert store.count() == 2
+
+
+def test_trend_and_most_missed(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.add_rows([
+        row("2026-01-01", "刑事訴訟法", "逕行搜索", "第130條", "評分：60 分。漏了第131條"),
+        row("2026-01-01", "刑事訴訟法", "逕行搜索", "第130條", "評分：70 分。漏了第131條與第131條之1"),
+        row("2026-01-02", "刑事訴訟法", "第131條", "第131條", "評分：90 分"),
+        row("2026-01-02", "刑法", "公務員", "第10條", "評分：50 分"),
+    ], first_row=2)
+    assert store.score_trend("刑事訴訟法") == [
+        {"日期": "2026-01-01", "平均分數": 65.0, "練習次數": 2},
+        {"日期": "2026-01-02", "平均分數": 90.0, "練習次數": 1},
+    ]
+    missed = store.most_missed("刑事訴訟法")
+    assert missed[0] == {"科目": "刑事訴訟法", "條文": "刑事訴訟法第131條", "漏答次數": 2}
+    assert {"科目": "刑事訴訟法", "條文": "刑事訴訟法第131-1條", "漏答次數": 1} in missed
+    assert store.most_missed("刑法") == []
+    assert store.last_row() == 5
+
+
+def test_rows_are_not_duplicated(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    rows = [row("2026-01-01", "刑法", "q", "a", "評分：50 分")]
+    store.add_rows(rows, first_row=2)
+    store.add_rows(rows, first_row=2)
+    assert store.count() == 1
+
+
+def test_missed_articles_keep_the_law_name(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.add_rows([
+        row("2026-01-01", "海巡法規", "武器使用", "依海巡法第6條", "評分：60 分。另應引用器械使用條例第六條"),
+        row("2026-01-02", "海巡法規", "武器使用", "未寫條號", "評分：40 分。應引用海岸巡防法第6條、器械條例第 6 條"),
+    ], first_row=2)
+    assert store.most_missed("海巡法規") == [
+        {"科目": "海巡法規", "條文": "海岸巡防機關器械使用條例第6條", "漏答次數": 2},
+        {"科目": "海巡法規", "條文": "海岸巡防法第6條", "漏答次數": 1},
+    ]
+
+
+def test_old_bare_number_rows_are_recomputed(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    store.add_rows([row("2026-01-01", "刑事訴訟法", "逕行搜索", "第130條", "評分：60 分。漏了第一百三十一條")], first_row=2)
+    # 模擬舊版資料庫：只存條號
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE missed_counts SET article = '131'")
+        db.execute("PRAGMA user_version = 0")
+    assert HistoryStore(path).most_missed() == [{"科目": "刑事訴訟法", "條文": "刑事訴訟法第131條", "漏答次數": 1}]
@@ -0,0 +1,61 @@
+import json
+import os
+
+from law_index import retrieve
+from laws import law_database
+
+
+def test_bundled_manifest_loads_every_subject():
+    assert list(law_database) == ["海巡法規", "刑法", "刑事訴訟法", "行政法"]
+    assert law_database.version
+    for subject in ("海巡法規", "刑法", "刑事訴訟法"):
+        assert len(law_database.index(subject)) > 0
+    assert len(law_database.index("行政法")) == 0
+
+
+def test_loads_lazily_per_subject(corpus):
+    assert corpus._files == {}
+    corpus.index("空科")
+    assert corpus._files == {}
+    assert [a.key for a in corpus.index("甲科").articles] == ["甲法第1條", "甲法第131條", "乙法第131-1條"]
+    assert set(corpus._files) == {"甲法", "乙法"}
+
+
+def test_mapping_interface_matches_old_dict(corpus):
+    assert corpus["空科"] == "尚未收錄"
+    assert "第 1 條" in corpus["甲科"] and "第 131 條之1" in corpus["甲科"]
+    assert corpus.get("不存在") is None
+    assert retrieve(corpus, "空科", "任何問題") == "尚未收錄"
+    assert "搜索票" in retrieve(corpus, "甲科", "搜索票")
+
+
+def test_reloads_when_file_changes(corpus, tmp_path):
+    before = corpus.digest("甲科")
+    index = corpus.index("甲科")
+    path = tmp_path / "甲法.txt"
+    path.write_text("【甲法】\n第 1 條\n為保護海洋。\n第 3 條\n新增條文。\n", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    assert corpus.digest("甲科") != before
+    assert corpus.index("甲科") is not index
+    assert len(corpus.index("甲科")) == 3
+
+
+def test_touch_without_content_change_keeps_records(corpus, tmp_path):
+    index = corpus.index("甲科")
+    os.utime(tmp_path / "甲法.txt", ns=(1, 1))
+    assert corpus.index("甲科") is index
+
+
+def test_manifest_changes_are_picked_up(corpus, tmp_path):
+    manifest = json.loads((tmp_path / "manifest.json").read_text(encoding="utf-8"))
+    manifest["subjects"]["丁科"] = {"laws": ["乙法"]}
+    manifest["version"] = "2"
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+    assert "丁科" in corpus and corpus.version == "2"
+    assert len(corpus.index("丁科")) == 1
+
+
+def test_keeps_previous_version_while_file_is_missing(corpus, tmp_path):
+    index = corpus.index("甲科")
+    os.remove(tmp_path / "甲法.txt")
+    assert corpus.index("甲科") is index
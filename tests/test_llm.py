@@ -0,0 +1,55 @@
+import pytest
+
+import instrument
+from fakes import FakeGroq, FakeStatusError
+from llm import MODEL, CallStats, complete_chat, stream_chat
+
+MESSAGES = [{"role": "user", "content": "請出一題"}]
+
+
+@pytest.fixture
+def calls():
+    seen = []
+    listener = instrument.add_listener(lambda e: seen.append(e) if e["name"] == "llm_call" else None)
+    yield seen
+    instrument.remove_listener(listener)
+
+
+def test_stream_fills_timing_text_and_usage(calls):
+    fake = FakeGroq(["一二三四五六七八九十"], first_token_delay=0.05, chunk_delay=0.01, chunk_size=3)
+    stats = CallStats()
+    parts = list(stream_chat(fake, MESSAGES, stats=stats, kind="question"))
+    assert parts == ["一二三", "四五六", "七八九", "十"]
+    assert stats.text == "一二三四五六七八九十"
+    assert stats.chunks == 4
+    assert 0.05 <= stats.ttft < stats.total
+    assert stats.prompt_tokens == len("請出一題")
+    assert stats.completion_tokens == 10
+    assert stats.model == MODEL
+    assert stats.cost_usd > 0
+    assert fake.requests[0]["stream"] is True
+    event = calls[-1]
+    assert event["stream"] is True and event["kind"] == "question" and event["error"] is None
+    assert event["prompt_tokens"] == stats.prompt_tokens
+
+
+def test_complete_reads_usage(calls):
+    stats = CallStats()
+    assert complete_chat(FakeGroq(["好"]), MESSAGES, stats=stats) == "好"
+    assert stats.ttft == stats.total
+    assert stats.completion_tokens == 1
+    assert calls[-1]["stream"] is False
+
+
+def test_stream_error_is_emitted(calls):
+    fake = FakeGroq(["x"], errors=[FakeStatusError(500)])
+    with pytest.raises(FakeStatusError):
+        list(stream_chat(fake, MESSAGES, kind="feedback"))
+    assert "500" in calls[-1]["error"]
+    assert calls[-1]["stream"] is True
+
+
+def test_complete_error_is_emitted(calls):
+    with pytest.raises(FakeStatusError):
+        complete_chat(FakeGroq(["x"], errors=[FakeStatusError(503)]), MESSAGES)
+    assert "503" in calls[-1]["error"]
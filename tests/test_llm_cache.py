@@ -0,0 +1,176 @@
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=clock))
+    return clock
+
+
+class Interrupted(BaseException):
+    # 跟 Streamlit 的 RerunException 一樣不是 Exception
+    pass
+
+
+def run_concurrently(n, fn):
+    results, errors = [None] * n, [None] * n
+
+    def worker(i):
+        try:
+            results[i] = fn()
+        except BaseException as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_memory_tier_is_lru():
+    cache = LLMCache(path=None, memory_entries=2)
+    cache.put("a", "A", 60)
+    cache.put("b", "B", 60)
+    assert cache.get("a") == "A"
+    cache.put("c", "C", 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats["evictions"] == 1 and cache.stats["misses"] == 1
+
+
+def test_entries_expire_in_both_tiers(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = LLMCache(path)
+    cache.put("k", "text", ttl=10)
+    clock.now += 5
+    assert cache.get("k") == "text"
+    clock.now += 6
+    assert cache.get("k") is None
+    assert cache.stats["evictions"] == 2  # 記憶體一筆、磁碟一筆
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 0
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "cache.db")
+    LLMCache(path).put("k", "text", ttl=60)
+    cache = LLMCache(path)  # 重開 process：記憶體是空的
+    assert cache.get("k") == "text"
+    assert cache.get("k") == "text"
+    assert (cache.stats["disk_hits"], cache.stats["memory_hits"]) == (1, 1)
+
+
+def test_disk_tier_drops_least_recently_used(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "cache.db"), memory_entries=0, disk_entries=2)
+    cache.put("a", "A", 60)
+    clock.now += 1
+    cache.put("b", "B", 60)
+    clock.now += 1
+    assert cache.get("a") == "A"  # a 最近用過
+    clock.now += 1
+    cache.put("c", "C", 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+
+
+def test_concurrent_identical_calls_share_one_request():
+    cache = LLMCache(path=None)
+    release, calls = threading.Event(), []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "批改"
+
+    threads, results, errors = run_concurrently(8, lambda: cache.get_or_compute("k", compute, 60))
+    while cache.stats["coalesced"] < 7:
+        threading.Event().wait(0.001)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1 and errors == [None] * 8
+    assert sorted(results) == [("批改", False)] + [("批改", True)] * 7
+    assert cache.stats["misses"] == 1 and cache.stats["coalesced"] == 7
+    assert cache.get_or_compute("k", compute, 60) == ("批改", True)
+
+
+def test_leader_error_reaches_followers():
+    cache = LLMCache(path=None)
+    started, release = threading.Event(), threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("429")
+
+    threads, _, errors = run_concurrently(1, lambda: cache.get_or_compute("k", compute, 60))
+    started.wait(5)
+    followers, _, follower_errors = run_concurrently(2, lambda: cache.get_or_compute("k", compute, 60))
+    while cache.stats["coalesced"] < 2:
+        threading.Event().wait(0.001)
+    release.set()
+    for t in threads + followers:
+        t.join(5)
+    assert [type(e) for e in errors + follower_errors] == [RuntimeError] * 3
+    assert cache.get("k") is None
+
+
+def test_follower_recomputes_when_leader_is_interrupted():
+    cache = LLMCache(path=None)
+    started, release = threading.Event(), threading.Event()
+
+    def interrupted():
+        started.set()
+        release.wait(5)
+        raise Interrupted()
+
+    threads, _, errors = run_concurrently(1, lambda: cache.get_or_compute("k", interrupted, 60))
+    started.wait(5)
+    followers, results, _ = run_concurrently(1, lambda: cache.get_or_compute("k", lambda: "重算", 60))
+    while cache.stats["coalesced"] < 1:
+        threading.Event().wait(0.001)
+    release.set()
+    for t in threads + followers:
+        t.join(5)
+    assert isinstance(errors[0], Interrupted)
+    assert results == [("重算", False)]
+    assert cache.stats["misses"] == 2
+
+
+def test_uncacheable_results_are_shared_but_not_stored():
+    # 限流時換成備援模型的回答：這次等待的人可以用，但不能存成主模型的快取
+    cache = LLMCache(path=None)
+    release = threading.Event()
+
+    def fallback_answer():
+        release.wait(5)
+        return "備援模型的批改"
+
+    threads, results, _ = run_concurrently(
+        3, lambda: cache.get_or_compute("k", fallback_answer, 60, cacheable=lambda text: text != "備援模型的批改")
+    )
+    while cache.stats["coalesced"] < 2:
+        threading.Event().wait(0.001)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert sorted(results) == [("備援模型的批改", False)] + [("備援模型的批改", True)] * 2
+    assert cache.get("k") is None
+    assert cache.get_or_compute("k", lambda: "主模型的批改", 60, cacheable=lambda text: True) == ("主模型的批改", False)
+    assert cache.get("k") == "主模型的批改"
@@ -0,0 +1,146 @@
+import random
+
+import pytest
+
+import instrument
+from fakes import FakeGroq, FakeStatusError
+from grading import grade
+from llm import MODEL, CallStats, complete_chat, stream_chat
+from llm_cache import LLMCache, cache_key
+from llm_guard import GuardedGroq, RateLimiter, TokenBucket
+
+FALLBACK = "llama-3.1-8b-instant"
+MESSAGES = [{"role": "user", "content": "題目"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def events():
+    seen = []
+    listener = instrument.add_listener(seen.append)
+    yield seen
+    instrument.remove_listener(listener)
+
+
+def unlimited():
+    return {m: RateLimiter(10_000, 10**9) for m in (MODEL, FALLBACK)}
+
+
+def guard(fake, **kwargs):
+    kwargs.setdefault("limiters", unlimited())
+    kwargs.setdefault("deadline", None)
+    return GuardedGroq(fake, **kwargs)
+
+
+def test_429_honours_retry_after(events):
+    sleeps = []
+    fake = FakeGroq(["ok"], errors=[FakeStatusError(429, retry_after=7)])
+    assert complete_chat(guard(fake, sleep=sleeps.append), MESSAGES) == "ok"
+    assert sleeps == [7.0]
+    assert [r["model"] for r in fake.requests] == [MODEL, MODEL]
+    assert [e["http_status"] for e in events if e["name"] == "llm_retry"] == [429]
+
+
+def test_backoff_is_jittered_without_header():
+    sleeps = []
+    fake = FakeGroq(["ok"], errors=[FakeStatusError(503), FakeStatusError(503), FakeStatusError(503)])
+    client = guard(fake, sleep=sleeps.append, base_delay=1.0, rng=random.Random(1))
+    assert complete_chat(client, MESSAGES) == "ok"
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= 2 ** attempt
+    assert len(set(sleeps)) == 3
+
+
+def test_non_retryable_error_passes_through():
+    sleeps = []
+    fake = FakeGroq(["ok"], errors=[FakeStatusError(400)])
+    with pytest.raises(FakeStatusError):
+        complete_chat(guard(fake, sleep=sleeps.append), MESSAGES)
+    assert len(fake.requests) == 1
+    assert sleeps == []
+
+
+def test_exhausted_429_falls_back_to_smaller_model(events):
+    fake = FakeGroq(["ok"], errors=[FakeStatusError(429)] * 4)
+    stats = CallStats()
+    complete_chat(guard(fake, sleep=lambda s: None, max_retries=3), MESSAGES, stats=stats)
+    assert [r["model"] for r in fake.requests] == [MODEL] * 4 + [FALLBACK]
+    assert stats.model == FALLBACK
+    assert any(e["name"] == "llm_fallback" for e in events)
+
+
+def test_slow_first_chunk_falls_back_when_streaming(events):
+    fake = FakeGroq(["好的回答"], model_delays={MODEL: 1.0, FALLBACK: 0.0})
+    stats = CallStats()
+    text = "".join(stream_chat(guard(fake, deadline=0.1), MESSAGES, stats=stats))
+    assert text == "好的回答"
+    assert stats.model == FALLBACK
+    assert stats.total < 0.5
+    fallback = [e for e in events if e["name"] == "llm_fallback"]
+    assert fallback and fallback[0]["next_model"] == FALLBACK
+
+
+def test_slow_response_falls_back_without_streaming():
+    fake = FakeGroq(["ok"], model_delays={MODEL: 1.0, FALLBACK: 0.0})
+    stats = CallStats()
+    assert complete_chat(guard(fake, deadline=0.1), MESSAGES, stats=stats) == "ok"
+    assert stats.model == FALLBACK
+
+
+def test_fallback_answer_is_not_cached_under_primary_key(tmp_path):
+    fake = FakeGroq(["8B 批改"], errors=[FakeStatusError(429)] * 4)
+    cache = LLMCache(path=str(tmp_path / "cache.db"))
+    client = guard(fake, sleep=lambda s: None)
+    text, stats = grade(client, cache, {"刑法": "第 1 條 行為之處罰，以行為時之法律有明文規定者為限。"}, "刑法", "題目", "擬答")
+    assert text == "8B 批改" and stats.model == FALLBACK
+    messages = [r["messages"] for r in fake.requests][-1]
+    assert cache.get(cache_key(MODEL, messages)) is None
+
+
+def test_token_bucket_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)  # 每秒回補 1
+    bucket.take(60)
+    assert bucket.wait_time(3) == pytest.approx(3)
+    bucket.take(3)
+    assert clock.sleeps == [pytest.approx(3)]
+
+
+def test_rate_limiter_waits_on_rpm():
+    clock = FakeClock()
+    limiter = RateLimiter(2, 10_000, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        limiter.acquire(100)
+    assert clock.sleeps == [pytest.approx(30)]
+
+
+def test_rate_limiter_waits_on_tpm():
+    clock = FakeClock()
+    limiter = RateLimiter(100, 600, clock=clock, sleep=clock.sleep)
+    limiter.acquire(600)
+    assert limiter.wait_time(300) == pytest.approx(30)
+    limiter.acquire(300)
+    assert clock.sleeps == [pytest.approx(30)]
+
+
+def test_guard_acquires_from_shared_limiter():
+    clock = FakeClock()
+    limiters = {MODEL: RateLimiter(1, 10**9, clock=clock, sleep=clock.sleep)}
+    fake = FakeGroq(["ok"])
+    client = guard(fake, limiters=limiters)
+    complete_chat(client, MESSAGES)
+    complete_chat(guard(fake, limiters=limiters), MESSAGES)
+    assert clock.sleeps == [pytest.approx(60)]
@@ -0,0 +1,51 @@
+import instrument
+import notion
+from fakes import FakeNotionSession, Faults
+from outbox import Outbox
+
+
+def record(i=0):
+    return {"created_at": "2026-01-01 12:00:00", "subject": "刑法", "question": f"題目{i}", "answer": "擬答", "feedback": "建議"}
+
+
+def collect(names):
+    seen = []
+    listener = instrument.add_listener(lambda e: seen.append(e) if e["name"] in names else None)
+    return seen, listener
+
+
+def test_deliveries_and_retries_keep_the_trace_id(tmp_path):
+    calls = []
+
+    def flaky(rec):
+        calls.append(rec["id"])
+        if len(calls) == 1:
+            raise RuntimeError("暫時失敗")
+        return 200
+
+    seen, listener = collect({"deliver"})
+    try:
+        box = Outbox({"flaky": flaky}, path=str(tmp_path / "outbox.db"), base_delay=0.01)
+        with instrument.trace("trace-1"):
+            box.enqueue(record())
+        assert box.wait_idle(timeout=10, poll=0.01)
+    finally:
+        instrument.remove_listener(listener)
+    assert [e["outcome"] for e in seen] == ["retry", "delivered"]
+    assert {e["trace"] for e in seen} == {"trace-1"}
+
+
+def test_notion_batch_keeps_the_trace_id(tmp_path):
+    session = FakeNotionSession(Faults())
+    sink = notion.notion_sink("token", "db", lambda: session)
+    seen, listener = collect({"deliver", "notion_http"})
+    try:
+        box = Outbox({"Notion": sink}, path=str(tmp_path / "outbox.db"))
+        with instrument.trace("trace-2"):
+            box.enqueue_many([record(i) for i in range(5)])
+        assert box.wait_idle(timeout=10, poll=0.01)
+    finally:
+        instrument.remove_listener(listener)
+    assert len(session.pages) == 5
+    assert {e["trace"] for e in seen} == {"trace-2"}
+    assert {e.get("batch") for e in seen if e["name"] == "deliver"} == {5}
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+import prompts
+from citations import check_citations
+from law_index import LawIndex, estimate_tokens
+from laws import law_database
+from prompts import feedback_prompt, fit_articles, fit_lines, fit_text, question_prompt
+
+LONG_ANSWER = "依刑訴第133條之1。" + "本題涉及基本權之限制，應依比例原則審查。" * 300 + "結論：扣押合法。"
+
+
+def test_fit_text_is_deterministic_and_within_budget():
+    text = "一二三四五六七八九十" * 100
+    assert fit_text(text, 2000) == text
+    trimmed = fit_text(text, 100, tail_ratio=0.3)
+    assert estimate_tokens(trimmed) <= 100
+    assert trimmed == fit_text(text, 100, tail_ratio=0.3)
+    assert trimmed.startswith("一二三") and trimmed.endswith("八九十") and "中略" in trimmed
+    assert "以下略" in fit_text(text, 100)
+
+
+def test_fit_lines_counts_the_omission_marker():
+    fitted = fit_lines(["甲" * 30] * 10, 100)
+    assert estimate_tokens(fitted) + fitted.count("\n") <= 100
+    assert fitted.endswith("…(另 7 項略)")
+
+
+def test_fit_articles_summarizes_lower_ranked_articles(corpus):
+    articles = corpus.index("丙科").articles
+    fitted = fit_articles(articles, 1000)
+    assert estimate_tokens(fitted) <= 1000
+    assert fitted.startswith("【丙法】第 1 條")
+    assert "其他相關條文 (僅列標題)" in fitted and "- 【丙法】第 8 條（第8條標題）" in fitted
+    # 第一條就超過預算也要截短放進去
+    assert estimate_tokens(fit_articles(articles, 50)) <= 50
+
+
+def test_question_prompt_keeps_stable_prefix_and_reports_savings(corpus):
+    build = question_prompt(corpus, "丙科", random.Random(0), budgets={"statutes": 800})
+    system, user = build.messages
+    assert system == {"role": "system", "content": prompts.QUESTION_INSTRUCTIONS}
+    assert user["content"].startswith("參考法規資料：\n【丙法】") and user["content"].endswith("科目：丙科")
+    assert build.sections["statutes"] <= 800 and "statutes" in build.trimmed
+    assert build.saved == build.baseline_tokens - build.tokens > 0
+    assert build.report()["tokens_saved"] == build.saved
+
+
+def test_feedback_prompt_orders_sections_and_trims_long_answer():
+    build = feedback_prompt(law_database, "刑事訴訟法", "試述刑事訴訟法第 133-1 條之要件", LONG_ANSWER)
+    user = build.messages[1]["content"]
+    order = [user.index(h) for h in ("應引用條文", "題目：", "考生回答：", "引用條文檢查")]
+    assert order == sorted(order)
+    assert user.startswith("應引用條文 (題目指定)：\n[1] 【刑事訴訟法】第 133-1 條")
+    assert "中略" in user and "結論：扣押合法。" in user
+    assert build.sections["answer"] <= prompts.SECTION_BUDGETS["answer"]
+    assert set(build.trimmed) == {"answer"} and build.saved > 0
+
+
+def test_feedback_savings_are_measured_against_the_previous_template(monkeypatch):
+    question, answer = "試述刑事訴訟法第 133-1 條之要件", "依刑訴第133條之1"
+    report = check_citations(law_database, "刑事訴訟法", question, answer)
+    # 題目有寫條號：不用另外跑 BM25
+    monkeypatch.setattr(LawIndex, "search", lambda *a, **k: pytest.fail("不該檢索"))
+    build = feedback_prompt(law_database, "刑事訴訟法", question, answer)
+    assert build.baseline_tokens == estimate_tokens(prompts.legacy_feedback_prompt(question, answer, report))
+    # 沒有截短時不會比原本的模板大太多 (只差分段標記)
+    assert not build.trimmed and abs(build.saved) <= 10
+    assert "﹝2﹞" not in build.messages[1]["content"]  # 預設只帶摘錄，不帶全文
+
+
+def test_full_statutes_are_opt_in(monkeypatch):
+    monkeypatch.setattr(prompts, "FULL_STATUTES", True)
+    build = feedback_prompt(law_database, "刑事訴訟法", "試述刑事訴訟法第 133-1 條之要件", "依刑訴第133條之1")
+    user = build.messages[1]["content"]
+    assert user.startswith("應引用條文 (題目指定)：\n【刑事訴訟法】第 133-1 條") and "﹝4﹞" in user
+    assert build.sections["statutes"] <= prompts.SECTION_BUDGETS["statutes"]
+
+
+def test_feedback_prefix_is_shared_across_answers_to_the_same_question():
+    question = "試述刑事訴訟法第 133-1 條之要件"
+    first = feedback_prompt(law_database, "刑事訴訟法", question, "依刑訴第133條之1").messages
+    second = feedback_prompt(law_database, "刑事訴訟法", question, "未寫條號，依比例原則").messages
+    assert first[0] == second[0]
+    prefix = first[1]["content"].split("考生回答：")[0]
+    assert second[1]["content"].startswith(prefix)
+
+
+def test_without_citation_check_uses_retrieved_statutes(monkeypatch):
+    monkeypatch.setattr(prompts, "CITATION_CHECK", False)
+    build = feedback_prompt(law_database, "刑事訴訟法", "何時得逕行搜索？", "依第131條")
+    user = build.messages[1]["content"]
+    assert user.startswith("參考法條：\n【刑事訴訟法】") and "引用條文檢查" not in user
+
+
+def test_placeholder_subject(corpus):
+    build = feedback_prompt(corpus, "空科", "題目", "擬答")
+    assert build.messages[1]["content"].startswith("題目：題目")
+    assert "尚未收錄" not in build.messages[1]["content"]
+    assert question_prompt(corpus, "空科").messages[1]["content"].startswith("參考法規資料：\n尚未收錄")
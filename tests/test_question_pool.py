@@ -0,0 +1,26 @@
+from question_pool import QuestionPool
+
+LAWS = {
+    "刑法": "第 1 條 行為之處罰，以行為時之法律有明文規定者為限。",
+    "行政法": "目前專注於海巡核心法規，請選擇其他科目。",
+}
+
+
+def test_refill_skips_subjects_without_articles(tmp_path):
+    asked = []
+    pool = QuestionPool(lambda subject: asked.append(subject) or f"{subject}題目", LAWS,
+                        path=str(tmp_path / "pool.json"), watermark=2, requests_per_minute=0)
+    while pool.refill_once():
+        pass
+    assert asked == ["刑法", "刑法"]
+    assert pool.size("刑法") == 2
+    assert pool.size("行政法") == 0
+
+
+def test_pool_drops_questions_when_law_changes(tmp_path):
+    laws = dict(LAWS)
+    pool = QuestionPool(lambda subject: "題目", laws, path=str(tmp_path / "pool.json"), watermark=1, requests_per_minute=0)
+    pool.refill_once()
+    assert pool.size("刑法") == 1
+    laws["刑法"] += "\n第 2 條 行為後法律有變更者，適用行為時之法律。"
+    assert pool.size("刑法") == 0
@@ -0,0 +1,55 @@
+import threading
+
+from fakes import FakeGspread, Faults
+from sheets import HEADER, BatchWriter, SheetHandle, sheet_sink
+
+
+def writer_for(gspread):
+    return BatchWriter(SheetHandle({}, connect=gspread.connect))
+
+
+def test_many_appends_reuse_one_connection():
+    gspread = FakeGspread()
+    writer = writer_for(gspread)
+    for i in range(20):
+        writer.append([str(i)] * 5)
+    assert gspread.calls["authorize"] == 1
+    assert gspread.calls["open"] == 1
+    assert gspread.worksheet.calls["row_values"] == 1
+    assert gspread.worksheet.calls["get_all_values"] == 0
+    assert gspread.worksheet.rows[0] == HEADER
+    assert len(gspread.worksheet.rows) == 21
+
+
+def test_header_not_written_to_a_sheet_that_has_one():
+    gspread = FakeGspread(rows=[HEADER, ["x"] * 5])
+    writer_for(gspread).append(["y"] * 5)
+    assert gspread.worksheet.calls["append_row"] == 0
+    assert gspread.worksheet.rows[-1] == ["y"] * 5
+
+
+def test_concurrent_appends_are_coalesced():
+    gspread = FakeGspread(faults=Faults(latency=0.02))
+    writer = writer_for(gspread)
+    writer.append(["warm-up"] * 5)
+    threads = [threading.Thread(target=writer.append, args=([str(i)] * 5,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    appended = gspread.worksheet.calls["append_rows"] - 1
+    assert len(gspread.worksheet.rows) == 1 + 1 + 16
+    assert 1 <= appended < 16
+    assert gspread.calls["authorize"] == 1
+
+
+def test_sink_batch_is_one_append_rows(monkeypatch):
+    import sheets
+
+    gspread = FakeGspread()
+    monkeypatch.setattr(sheets, "_writer", writer_for(gspread))
+    records = [{"created_at": "t", "subject": "刑法", "question": f"q{i}", "answer": "a", "feedback": "f"} for i in range(10)]
+    send = sheet_sink(None)
+    assert send.batch(records) == [200] * 10
+    assert gspread.worksheet.calls["append_rows"] == 1
+    assert len(gspread.worksheet.rows) == 11